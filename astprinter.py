@@ -1,27 +1,87 @@
+import io
+from typing import Dict, List, TextIO
 from expr import Literal, Unary, Visitor, Binary, Grouping, Expr, Token
+from expr import BINARY, GROUPING, LITERAL, UNARY, KINDS as NODE_KINDS
 from loxtoken import TokenType
 
+# Number of pieces gathered before writing them to the sink
+FLUSH_PIECES: int = 4096
+
+# Kinds of the items on the stack of the printers which aren't nodes, the
+# nodes have their generated kind
+TEXT: int = -1
+OTHER: int = -2
+
+# Kind of each class met so far, subclasses of the nodes are added when met
+KINDS: Dict[type, int] = {str: TEXT, **NODE_KINDS}
+
+
+def kindOf(cls: type) -> int:
+    # Subclasses of the nodes inherit the kind tag of their base
+    kind: int = getattr(cls, "kind", OTHER) if issubclass(cls, Expr) else OTHER
+    KINDS[cls] = kind
+    return kind
+
 
 class AstPrinter(Visitor):
     """Printer to show the nesting of the expression"""
 
     def print(self, expr: Expr) -> str:
-        return expr.accept(self)
+        output: io.StringIO = io.StringIO()
+        self.write(expr, output)
+        return output.getvalue()
 
-    def parenthesize(self, name: str, *args: Expr):
-        output: str = "("
-        output += name
-        for expr in args:
-            output += " " + expr.accept(self)
-        output += ")"
-        return output
+    def write(self, expr: Expr, sink: TextIO) -> None:
+        """Stream the printed expression to sink. The tree is walked with an
+        explicit stack of the nodes left to print and of the text after them,
+        so deep trees are fine and each piece is copied once. The leftmost
+        child is printed right away instead of going through the stack."""
+        pieces: List[str] = []
+        append = pieces.append
+        stack: List[Expr | str] = [expr]
+        push = stack.append
+        pop = stack.pop
+        kinds: Dict[type, int] = KINDS
+        while stack:
+            item: Expr | str = pop()
+            while True:
+                kind: int | None = kinds.get(type(item))
+                if kind is None:
+                    kind = kindOf(type(item))
+                if kind == BINARY:
+                    append("(" + item.operator.lexeme + " ")
+                    push(")")
+                    push(item.right)
+                    push(" ")
+                    item = item.left
+                elif kind == LITERAL:
+                    append(self.visitLiteralExpr(item))
+                    break
+                elif kind == TEXT:
+                    append(item)
+                    break
+                elif kind == UNARY:
+                    append("(" + item.operator.lexeme + " ")
+                    push(")")
+                    item = item.right
+                elif kind == GROUPING:
+                    append("(group ")
+                    push(")")
+                    item = item.expression
+                else:
+                    append(item.accept(self))
+                    break
+            if len(pieces) >= FLUSH_PIECES:
+                sink.write("".join(pieces))
+                pieces.clear()
+        sink.write("".join(pieces))
 
     # Implement the Visitor interface
     def visitBinaryExpr(self, expr: Binary) -> str:
-        return self.parenthesize(expr.operator.lexeme, expr.left, expr.right)
+        return self.print(expr)
 
     def visitGroupingExpr(self, expr: Grouping) -> str:
-        return self.parenthesize("group", expr.expression)
+        return self.print(expr)
 
     def visitLiteralExpr(self, expr: Literal) -> str:
         if expr.value is None:
@@ -29,7 +89,7 @@ class AstPrinter(Visitor):
         return str(expr.value)
 
     def visitUnaryExpr(self, expr: Unary) -> str:
-        return self.parenthesize(expr.operator.lexeme, expr.right)
+        return self.print(expr)
 
 
 if __name__ == "__main__":
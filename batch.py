@@ -0,0 +1,196 @@
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from expr import Binary, Expr, Grouping, Literal, Unary, Visitor, preorder
+from exprcompiler import Closure, ExprCompiler
+from interpreter import LoxRuntimeError
+from loxtoken import Token, TokenType
+
+try:
+    import numpy
+except ImportError:  # Optional, the rows are then evaluated one by one
+    numpy = None
+
+# Kinds of the vectorized values, Lox numbers are float64 and booleans bool
+NUMBER: str = "number"
+BOOLEAN: str = "boolean"
+
+# A vectorized value: its kind and a numpy array or scalar
+Vector = Tuple[str, Any]
+
+# Binary operators mapping two number vectors to a vector
+ARITHMETIC: Dict[TokenType, Tuple[str, Callable[[Any, Any], Any]]] = {}
+if numpy is not None:
+    ARITHMETIC = {
+        TokenType.PLUS: (NUMBER, numpy.add),
+        TokenType.MINUS: (NUMBER, numpy.subtract),
+        TokenType.STAR: (NUMBER, numpy.multiply),
+        # IEEE division like interpreter.divide once the warnings are off
+        TokenType.SLASH: (NUMBER, numpy.divide),
+        TokenType.GREATER: (BOOLEAN, numpy.greater),
+        TokenType.GREATER_EQUAL: (BOOLEAN, numpy.greater_equal),
+        TokenType.LESS: (BOOLEAN, numpy.less),
+        TokenType.LESS_EQUAL: (BOOLEAN, numpy.less_equal),
+    }
+
+
+def literals(expr: Expr) -> List[Literal]:
+    """Literals of an expression in source order, to pick the inputs"""
+    return [node for node in preorder(expr) if isinstance(node, Literal)]
+
+
+class Unsupported(Exception):
+    """The expression can't be evaluated on whole columns"""
+
+
+class RowCompiler(ExprCompiler):
+    """ExprCompiler where the input literals read the values of the current
+    row instead of their constant"""
+
+    def __init__(self, inputs: Sequence[Literal]):
+        self.positions: Dict[int, int] = {
+            id(literal): position for position, literal in enumerate(inputs)
+        }
+        self.row: List[Any] = [None] * len(inputs)
+
+    def visitLiteralExpr(self, expr: Literal) -> Closure:
+        position: int | None = self.positions.get(id(expr))
+        if position is None:
+            return super().visitLiteralExpr(expr)
+        row: List[Any] = self.row
+        return lambda: row[position]
+
+
+class VectorEvaluator(Visitor):
+    """Evaluate an expression on whole columns, the inputs being given as
+    arrays. Only numbers and booleans are vectorized, the strings and nil
+    raise Unsupported. The kinds of a column are the same for all its rows so
+    a type error is the one every row would raise."""
+
+    def __init__(self, inputs: Sequence[Literal], columns: Sequence[Any]):
+        self.columns: Dict[int, Any] = {
+            id(literal): column for literal, column in zip(inputs, columns)
+        }
+
+    def evaluate(self, expr: Expr) -> Vector:
+        return expr.accept(self)
+
+    # Implement the Visitor interface
+    def visitBinaryExpr(self, expr: Binary) -> Vector:
+        leftKind, left = self.evaluate(expr.left)
+        rightKind, right = self.evaluate(expr.right)
+        operator: Token = expr.operator
+
+        match operator.type:
+            case TokenType.EQUAL_EQUAL:
+                if leftKind != rightKind:
+                    return BOOLEAN, numpy.False_
+                return BOOLEAN, numpy.equal(left, right)
+            case TokenType.BANG_EQUAL:
+                if leftKind != rightKind:
+                    return BOOLEAN, numpy.True_
+                return BOOLEAN, numpy.not_equal(left, right)
+
+        kind, function = ARITHMETIC[operator.type]
+        if leftKind != NUMBER or rightKind != NUMBER:
+            if operator.type == TokenType.PLUS:
+                raise LoxRuntimeError(
+                    operator, "Operands must be two numbers or two strings."
+                )
+            raise LoxRuntimeError(operator, "Operands must be numbers.")
+        return kind, function(left, right)
+
+    def visitGroupingExpr(self, expr: Grouping) -> Vector:
+        return self.evaluate(expr.expression)
+
+    def visitLiteralExpr(self, expr: Literal) -> Vector:
+        column: Any = self.columns.get(id(expr))
+        if column is not None:
+            if column.dtype == numpy.bool_:
+                return BOOLEAN, column
+            if column.dtype.kind in "iuf":
+                return NUMBER, column.astype(numpy.float64, copy=False)
+            raise Unsupported(f"Column of {column.dtype}")
+        value: object = expr.value
+        if type(value) is bool:
+            return BOOLEAN, numpy.bool_(value)
+        if type(value) in (float, int):
+            return NUMBER, numpy.float64(value)
+        raise Unsupported(f"Literal {value!r}")
+
+    def visitUnaryExpr(self, expr: Unary) -> Vector:
+        kind, right = self.evaluate(expr.right)
+        if expr.operator.type == TokenType.BANG:
+            # Numbers are always truthy
+            if kind == NUMBER:
+                return BOOLEAN, numpy.False_
+            return BOOLEAN, numpy.logical_not(right)
+        if kind != NUMBER:
+            raise LoxRuntimeError(expr.operator, "Operand must be a number.")
+        return NUMBER, numpy.negative(right)
+
+
+class BatchEvaluator:
+    """
+    Evaluate an expression for many rows of inputs. The grammar has no
+    variables yet, so the inputs are literals of the expression (see
+    literals) whose value is taken from a column for each row.
+
+    With numpy the number and boolean columns are evaluated as whole array
+    operations, keeping the Lox semantics (IEEE division, typed equality,
+    numbers always truthy). Strings, nil and object columns fall back to
+    evaluating the rows one by one with a RowCompiler closure.
+    """
+
+    def __init__(self, expr: Expr, inputs: Sequence[Literal]):
+        self.expr: Expr = expr
+        self.inputs: List[Literal] = list(inputs)
+        self.compiler: RowCompiler = RowCompiler(self.inputs)
+        self.closure: Closure = self.compiler.compile(expr)
+        # Rows evaluated one by one by the last evaluate call
+        self.scalarRows: int = 0
+
+    def evaluate(self, columns: Sequence[Sequence[Any]], rows: int | None = None) -> Any:
+        """Results of the rows, a numpy array when numpy is available and a
+        list otherwise. rows is only needed when there are no inputs."""
+        if len(columns) != len(self.inputs):
+            raise ValueError(f"Expected {len(self.inputs)} columns")
+        if rows is None:
+            rows = len(columns[0]) if columns else 1
+        if numpy is None:
+            return self.evaluateRows(columns, rows)
+
+        arrays: List[Any] = [numpy.asarray(column) for column in columns]
+        if any(array.shape != (rows,) for array in arrays):
+            raise ValueError(f"Columns must all have {rows} rows")
+        try:
+            with numpy.errstate(divide="ignore", invalid="ignore", over="ignore"):
+                kind, result = VectorEvaluator(self.inputs, arrays).evaluate(self.expr)
+        except Unsupported:
+            values: List[Any] = self.evaluateRows(columns, rows)
+            result = numpy.empty(rows, dtype=object)
+            result[:] = values
+            return result
+        self.scalarRows = 0
+        dtype: Any = numpy.float64 if kind == NUMBER else numpy.bool_
+        return numpy.broadcast_to(result, (rows,)).astype(dtype)
+
+    def evaluateRows(self, columns: Sequence[Sequence[Any]], rows: int) -> List[Any]:
+        row: List[Any] = self.compiler.row
+        closure: Closure = self.closure
+        results: List[Any] = []
+        if not columns:
+            return [closure() for _ in range(rows)]
+        for values in zip(*columns):
+            row[:] = [toLox(value) for value in values]
+            results.append(closure())
+        self.scalarRows = rows
+        return results
+
+
+def toLox(value: Any) -> Any:
+    """Plain Python value of a column item, numpy scalars included"""
+    if numpy is not None and isinstance(value, numpy.generic):
+        value = value.item()
+    if type(value) is int:
+        return float(value)
+    return value
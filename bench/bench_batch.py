@@ -0,0 +1,50 @@
+# Rows/sec of the numpy batch evaluation of a rule against evaluating its
+# rows one by one, run with: python -m bench.bench_batch
+import argparse
+import random
+import time
+from typing import Any, List
+
+import batch
+from batch import BatchEvaluator, literals
+from bench.bench_vm import parse
+from expr import Expr, Literal
+
+# price * 1.2 - discount > 100 == !flagged, the inputs are the literals 0,
+# 0 and false in this order
+RULE: str = "0 * 1.2 - 0 > 100 == !false"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch evaluation benchmark")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--scalar-rows", type=int, default=100000, help="Rows one by one")
+    args = parser.parse_args()
+
+    expr: Expr = parse(RULE)
+    found: List[Literal] = literals(expr)
+    evaluator: BatchEvaluator = BatchEvaluator(expr, [found[0], found[2], found[4]])
+    rng: random.Random = random.Random(0)
+    prices: List[float] = [rng.uniform(0, 200) for _ in range(args.rows)]
+    discounts: List[float] = [rng.uniform(0, 50) for _ in range(args.rows)]
+    flags: List[bool] = [rng.random() < 0.3 for _ in range(args.rows)]
+
+    count: int = min(args.scalar_rows, args.rows)
+    begin: float = time.perf_counter()
+    expected: List[Any] = evaluator.evaluateRows(
+        [prices[:count], discounts[:count], flags[:count]], count
+    )
+    scalar: float = count / (time.perf_counter() - begin)
+    print(RULE)
+    print(f"row by row: {scalar:14,.0f} rows/sec")
+
+    if batch.numpy is None:
+        print("numpy is not installed, no batch evaluation")
+    else:
+        numpy = batch.numpy
+        columns = [numpy.array(prices), numpy.array(discounts), numpy.array(flags)]
+        begin = time.perf_counter()
+        results = evaluator.evaluate(columns)
+        vector: float = args.rows / (time.perf_counter() - begin)
+        assert results[:count].tolist() == expected
+        print(f"numpy:      {vector:14,.0f} rows/sec (x{vector / scalar:.0f})")
@@ -0,0 +1,45 @@
+# Cold (scan, parse and store) against warm (load from the cache) runs of a
+# script, run with: python -m bench.bench_cache
+import argparse
+import os
+import random
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from bench.bench_reparse import makeNested
+from cache import ScriptCache
+from plox import OUTPUTS, Lox
+
+
+def timeRun(script_file: str, output: str, cache: ScriptCache, cold: bool) -> float:
+    if cold:
+        cache.clear()
+    begin: float = time.perf_counter()
+    with open(os.devnull, "w") as sink, redirect_stdout(sink):
+        Lox(output=output, cache=cache).processFile(script_file)
+    return time.perf_counter() - begin
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Script cache benchmark")
+    parser.add_argument("--depth", type=int, default=14, help="Script of 2**depth operands")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measure")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        script_file: str = os.path.join(directory, "bench.lox")
+        with open(script_file, "w") as f:
+            f.write(makeNested(args.depth, random.Random(0)))
+        cache: ScriptCache = ScriptCache(os.path.join(directory, "cache"))
+        for output in OUTPUTS:
+            cold: float = min(
+                timeRun(script_file, output, cache, True) for _ in range(args.repeat)
+            )
+            warm: float = min(
+                timeRun(script_file, output, cache, False) for _ in range(args.repeat)
+            )
+            print(
+                f"{output:>6}: cold {cold * 1000:8.2f}ms, warm {warm * 1000:8.2f}ms "
+                f"({cold / warm:.1f}x)"
+            )
@@ -0,0 +1,25 @@
+# Evaluations/sec of the closure compiled expressions against the
+# accept based Interpreter, run with: python -m bench.bench_closures
+import argparse
+
+from bench.bench_vm import EXPRESSION, parse, timeLoop
+from expr import Expr
+from exprcompiler import Closure, ExprCompiler
+from interpreter import Interpreter
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Closure compiler benchmark")
+    parser.add_argument("--count", type=int, default=100000, help="Evaluations")
+    parser.add_argument("--expression", type=str, default=EXPRESSION)
+    args = parser.parse_args()
+
+    expr: Expr = parse(args.expression)
+    closure: Closure = ExprCompiler().compile(expr)
+    interpreter: Interpreter = Interpreter()
+    assert interpreter.evaluate(expr) == closure()
+
+    walking: float = timeLoop(lambda: interpreter.evaluate(expr), args.count)
+    calling: float = timeLoop(closure, args.count)
+    print(args.expression)
+    print(f"accept Interpreter: {args.count / walking:12,.0f} evaluations/sec")
+    print(f"ExprCompiler:       {args.count / calling:12,.0f} evaluations/sec (x{walking / calling:.2f})")
@@ -0,0 +1,47 @@
+# Scanning speed and memory of identifier heavy sources, the lexemes of the
+# identifiers being shared through the symbol table, run with:
+# python -m bench.bench_identifiers
+import argparse
+import time
+from typing import Dict, List
+
+from bench.bench_scanner import makeSource
+from bench.bench_tokens import measure
+from bench.corpus import generate
+from loxtoken import Token, TokenType
+from plox import Lox
+from scanner import ENGINES, Scanner
+
+
+def bench(name: str, source: str, repeat: int) -> None:
+    print(f"{name}: {len(source)} chars")
+    for engine in ENGINES:
+        best: float = float("inf")
+        for _ in range(repeat):
+            begin: float = time.perf_counter()
+            Scanner(Lox(), source, engine).scanTokens()
+            best = min(best, time.perf_counter() - begin)
+        scanner: Scanner = Scanner(Lox(), source, engine)
+        tokens, held = measure(scanner.scanTokens)
+        identifiers: List[Token] = [
+            token for token in tokens if token.type == TokenType.IDENTIFIER
+        ]
+        # Distinct lexeme objects of the identifiers, one per name once interned
+        strings: Dict[int, str] = {id(token.lexeme): token.lexeme for token in identifiers}
+        print(
+            f"  {engine:5}: {len(tokens) / best:12,.0f} tokens/sec"
+            f" {held / len(tokens):6.1f} bytes/token"
+            f" {len(identifiers)} identifiers, {len(scanner.symbols)} symbols,"
+            f" {len(strings)} lexeme strings"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Identifier scanning benchmark")
+    parser.add_argument("--size", type=int, default=200000, help="Tokens of classes")
+    parser.add_argument("--copies", type=int, default=500, help="Copies of test.lox")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    bench("classes", generate("classes", args.size), args.repeat)
+    bench("test.lox", makeSource(args.copies), args.repeat)
@@ -0,0 +1,156 @@
+# Memory, building and traversal speed of the nodes of each generateast
+# variant on the same tree, run with: python -m bench.bench_nodes
+import argparse
+import importlib.util
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import ModuleType
+from typing import Callable, Dict, List
+
+import serializer
+from bench.bench_tokens import measure
+from bench.bench_vm import parse
+from bench.corpus import generate
+from expr import Expr
+from loxtoken import Token, TokenType
+from tool.generateast import defineAst
+
+# Options of defineAst of each variant
+VARIANTS: Dict[str, Dict[str, bool]] = {
+    "plain": {},
+    "slots": {"slots": True},
+    "compact": {"slots": True, "compact": True, "kinds": True},
+}
+
+TYPES: List[str] = [
+    "Binary   : Expr left, Token operator, Expr right",
+    "Grouping : Expr expression",
+    "Literal  : object value",
+    "Unary    : Token operator, Expr right",
+]
+
+
+def generateVariant(name: str, directory: str, options: Dict[str, bool]) -> ModuleType:
+    output: Path = Path(directory) / name
+    output.mkdir()
+    defineAst(str(output), "Expr", TYPES, **options)
+    spec = importlib.util.spec_from_file_location(f"expr_{name}", output / "expr.py")
+    module: ModuleType = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class Factory:
+    """NodeFactory building the nodes of a generated module"""
+
+    def __init__(self, module: ModuleType):
+        self.binary = module.Binary
+        self.grouping = module.Grouping
+        self.literal = module.Literal
+        self.unary = module.Unary
+
+
+class Counter:
+    """Visitor returning the children of a node through accept"""
+
+    def visitBinaryExpr(self, expr) -> tuple:
+        return expr.left, expr.right
+
+    def visitGroupingExpr(self, expr) -> tuple:
+        return (expr.expression,)
+
+    def visitLiteralExpr(self, expr) -> tuple:
+        return ()
+
+    def visitUnaryExpr(self, expr) -> tuple:
+        return (expr.right,)
+
+
+def walkAccept(root: Expr) -> int:
+    counter: Counter = Counter()
+    count: int = 0
+    stack: List[Expr] = [root]
+    while stack:
+        count += 1
+        stack.extend(stack.pop().accept(counter))
+    return count
+
+
+def walkKinds(module: ModuleType) -> Callable[[Expr], int]:
+    BINARY, GROUPING, LITERAL, UNARY = (
+        module.BINARY,
+        module.GROUPING,
+        module.LITERAL,
+        module.UNARY,
+    )
+
+    def walk(root: Expr) -> int:
+        count: int = 0
+        stack: List[Expr] = [root]
+        push = stack.append
+        pop = stack.pop
+        while stack:
+            node: Expr = pop()
+            count += 1
+            # The kind is a class attribute, no call and no dict lookup
+            kind: int = node.kind
+            if kind == LITERAL:
+                continue
+            if kind == BINARY:
+                push(node.right)
+                push(node.left)
+            elif kind == UNARY:
+                push(node.right)
+            elif kind == GROUPING:
+                push(node.expression)
+        return count
+
+    return walk
+
+
+def construct(module: ModuleType, count: int) -> Callable[[], object]:
+    """Build count binary nodes, the constructors alone"""
+    binary, literal = module.Binary, module.Literal
+    left, right = literal(1.0), literal(2.0)
+    operator: Token = Token(TokenType.PLUS, "+", None, 1)
+    return lambda: [binary(left, operator, right) for _ in range(count)]
+
+
+def best(function: Callable[[], object], repeat: int) -> float:
+    times: List[float] = []
+    for _ in range(repeat):
+        begin: float = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - begin)
+    return min(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AST node variants benchmark")
+    parser.add_argument("--size", type=int, default=200000, help="Tokens of the tree")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data: bytes = serializer.dump(parse(generate("wide", args.size)))
+    with tempfile.TemporaryDirectory() as directory:
+        for name, options in VARIANTS.items():
+            module: ModuleType = generateVariant(name, directory, options)
+            factory: Factory = Factory(module)
+            tree, held = measure(lambda: serializer.load(data, factory))
+            count: int = walkAccept(tree)
+            build: Callable[[], object] = construct(module, count)
+            print(
+                f"{name:8}: {held / count:6.1f} bytes/node"
+                f" build {count / best(build, args.repeat):12,.0f} nodes/sec"
+                f" accept {count / best(lambda: walkAccept(tree), args.repeat):12,.0f} nodes/sec",
+                end="",
+            )
+            if options.get("kinds"):
+                walk: Callable[[Expr], int] = walkKinds(module)
+                assert walk(tree) == count
+                rate: float = count / best(lambda: walk(tree), args.repeat)
+                print(f" kinds {rate:12,.0f} nodes/sec", end="")
+            print()
@@ -0,0 +1,68 @@
+# Lox.run over the same few rule snippets again and again with and without
+# the in memory ParseCache, run with: python -m bench.bench_parsecache
+import argparse
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from typing import List
+
+from parsecache import ParseCache
+from plox import Lox
+
+# Rules like the ones a service loads from its configuration
+RULES: List[str] = [
+    "1200 * 1.2 - 35 > 1000 == !false",
+    "(3 + 4) * (5 - 2) / 7 >= 3",
+    '"gold" == "gold" != (10 < 20)',
+    "-(2 * 3.5) + 18 / (4 - 1) <= 0",
+    "!(99 > 100) == true",
+]
+
+
+def runAll(interpreter: Lox, runs: int) -> float:
+    """Seconds to run the rules runs times each"""
+    begin: float = time.perf_counter()
+    for index in range(runs * len(RULES)):
+        interpreter.run(RULES[index % len(RULES)])
+    return time.perf_counter() - begin
+
+
+def runThreads(prototype: Lox, runs: int, threads: int) -> float:
+    """Seconds to run the rules runs times each over threads, each one with
+    its own fork of the prototype"""
+    begin: float = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        list(
+            executor.map(
+                lambda _: runAll(prototype.fork(), runs // threads), range(threads)
+            )
+        )
+    return time.perf_counter() - begin
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In memory parse cache benchmark")
+    parser.add_argument("--runs", type=int, default=2000, help="Runs of each rule")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--output", type=str, default="ast", help="What run prints")
+    args = parser.parse_args()
+
+    cache: ParseCache = ParseCache()
+    # Shared by the interpreters of all the threads
+    shared: ParseCache = ParseCache()
+    # The output of the runs is discarded, redirected once for all the threads
+    with redirect_stdout(io.StringIO()):
+        uncached: float = runAll(Lox(output=args.output), args.runs)
+        cached: float = runAll(Lox(output=args.output, parseCache=cache), args.runs)
+        threaded: float = runThreads(
+            Lox(output=args.output, parseCache=shared), args.runs, args.threads
+        )
+
+    count: int = args.runs * len(RULES)
+    print(f"uncached:  {count / uncached:12,.0f} runs/sec")
+    print(f"cached:    {count / cached:12,.0f} runs/sec (x{uncached / cached:.1f})")
+    print(f"           {cache.stats()}")
+    count = args.runs // args.threads * args.threads * len(RULES)
+    print(f"{args.threads} threads: {count / threaded:12,.0f} runs/sec")
+    print(f"           {shared.stats()}")
@@ -0,0 +1,63 @@
+# Python calls per token and tokens/sec of the parsers, run with:
+# python -m bench.bench_parser
+import argparse
+import cProfile
+import pstats
+import random
+import time
+from typing import List
+
+from loxtoken import Token
+from parser import Parser
+from plox import Lox
+from prattparser import PrattParser
+from scanner import Scanner
+
+PARSERS: List[type] = [Parser, PrattParser]
+
+
+def makeExpression(terms: int, seed: int = 0) -> str:
+    """Flat expression mixing all the precedence levels and a few groups"""
+    rng: random.Random = random.Random(seed)
+    operators: List[str] = "== != < <= > >= + - * /".split()
+    parts: List[str] = []
+    for index in range(terms):
+        if index:
+            parts.append(rng.choice(operators))
+        operand: str = rng.choice(["1", "2.5", '"s"', "true", "nil", "(3 - 4)"])
+        parts.append(rng.choice(["", "-", "!"]) + operand)
+    return " ".join(parts)
+
+
+def countCalls(parserClass: type, tokens: List[Token]) -> int:
+    profiler: cProfile.Profile = cProfile.Profile()
+    profiler.enable()
+    parserClass(tokens).expression()
+    profiler.disable()
+    return pstats.Stats(profiler).total_calls
+
+
+def timeParse(parserClass: type, tokens: List[Token], repeat: int) -> float:
+    best: float = float("inf")
+    for _ in range(repeat):
+        begin: float = time.perf_counter()
+        parserClass(tokens).expression()
+        best = min(best, time.perf_counter() - begin)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parsers benchmark")
+    parser.add_argument("--terms", type=int, default=20000, help="Operands")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs")
+    args = parser.parse_args()
+
+    tokens: List[Token] = Scanner(Lox(), makeExpression(args.terms)).scanTokens()
+    print(f"{len(tokens)} tokens")
+    for parserClass in PARSERS:
+        calls: int = countCalls(parserClass, tokens)
+        elapsed: float = timeParse(parserClass, tokens, args.repeat)
+        print(
+            f"{parserClass.__name__:>12}: {calls / len(tokens):5.1f} calls/token, "
+            f"{len(tokens) / elapsed:10,.0f} tokens/sec"
+        )
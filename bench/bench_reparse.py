@@ -0,0 +1,59 @@
+# Latency of a reparse after a one token edit against a full parse as the
+# source grows, run with: python -m bench.bench_reparse
+import argparse
+import random
+import time
+from typing import List
+
+from incremental import IncrementalScanner
+from incrementalparser import IncrementalParser
+from parser import Parser
+from plox import Lox
+
+
+def makeNested(depth: int, rng: random.Random) -> str:
+    """Balanced expression of 2**depth operands, grouped pairwise"""
+    if depth == 0:
+        return rng.choice(["1", "2.5", "-3", "!nil", '"s"', "true"])
+    operator: str = rng.choice(["+", "-", "*", "/", "<", "==", "!="])
+    left: str = makeNested(depth - 1, rng)
+    right: str = makeNested(depth - 1, rng)
+    return f"({left} {operator} {right})"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental reparse benchmark")
+    parser.add_argument("--depths", type=int, nargs="+", default=[8, 10, 12, 14, 16])
+    parser.add_argument("--edits", type=int, default=20, help="Edits per size")
+    args = parser.parse_args()
+
+    for depth in args.depths:
+        rng: random.Random = random.Random(depth)
+        source: str = makeNested(depth, rng)
+        scanner: IncrementalScanner = IncrementalScanner(Lox(), source)
+        incremental: IncrementalParser = IncrementalParser(scanner.buffer)
+        incremental.expression()
+
+        scanning: List[float] = []
+        reparsing: List[float] = []
+        for _ in range(args.edits):
+            # Replace one digit of a random number literal
+            offset: int = rng.choice([i for i, c in enumerate(source) if c.isdigit()])
+            digit: str = rng.choice("0123456789")
+            source = source[:offset] + digit + source[offset + 1 :]
+            begin: float = time.perf_counter()
+            scanner.edit(offset, 1, digit)
+            scanned: float = time.perf_counter()
+            incremental.reparse(scanner.buffer, scanner.changed)
+            scanning.append(scanned - begin)
+            reparsing.append(time.perf_counter() - scanned)
+
+        begin = time.perf_counter()
+        Parser(scanner.buffer).expression()
+        full: float = time.perf_counter() - begin
+        print(
+            f"{len(scanner.buffer):>8} tokens: full parse {full * 1000:8.2f}ms, "
+            f"reparse {sorted(reparsing)[len(reparsing) // 2] * 1000:6.3f}ms "
+            f"(+ rescan {sorted(scanning)[len(scanning) // 2] * 1000:6.3f}ms), "
+            f"{incremental.reused} nodes reused"
+        )
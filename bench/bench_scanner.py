@@ -0,0 +1,45 @@
+# Throughput of the scanning engines, run with: python -m bench.bench_scanner
+import argparse
+import time
+from pathlib import Path
+
+from plox import Lox
+from scanner import ENGINES, Scanner
+
+SAMPLE: Path = Path(__file__).resolve().parent.parent / "test.lox"
+
+
+def makeSource(copies: int) -> str:
+    """Big script made of copies of test.lox mixed with some expressions"""
+    chunk: str = SAMPLE.read_text()
+    chunk += "\n// Expressions\n(1 + 2.5) * 3 >= -4 / (5 - 6) != !true == nil;\n"
+    return chunk * copies
+
+
+def timeEngine(engine: str, source: str, repeat: int) -> tuple[float, int]:
+    """Return the best time over repeat runs and the number of tokens"""
+    best: float = float("inf")
+    count: int = 0
+    for _ in range(repeat):
+        begin: float = time.perf_counter()
+        count = len(Scanner(Lox(), source, engine).scanTokens())
+        best = min(best, time.perf_counter() - begin)
+    return best, count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scanner engines benchmark")
+    parser.add_argument("--copies", type=int, default=2000, help="Copies of test.lox")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per engine")
+    args = parser.parse_args()
+
+    source: str = makeSource(args.copies)
+    print(f"Source of {len(source)} chars")
+    baseline: float = 0.0
+    for engine in ENGINES:
+        elapsed, count = timeEngine(engine, source, args.repeat)
+        baseline = baseline or elapsed
+        print(
+            f"{engine:>6}: {count} tokens in {elapsed:.3f}s, "
+            f"{count / elapsed:,.0f} tokens/sec (x{baseline / elapsed:.2f})"
+        )
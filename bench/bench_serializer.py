@@ -0,0 +1,49 @@
+# Loading a serialized tree against scanning and parsing its source again,
+# run with: python -m bench.bench_serializer
+import argparse
+import pickle
+import random
+import time
+from typing import Callable
+
+import serializer
+from bench.bench_reparse import makeNested
+from expr import Expr
+from parser import Parser
+from plox import Lox
+from scanner import Scanner
+
+
+def best(action: Callable[[], object], repeat: int) -> float:
+    elapsed: float = float("inf")
+    for _ in range(repeat):
+        begin: float = time.perf_counter()
+        action()
+        elapsed = min(elapsed, time.perf_counter() - begin)
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Expr serialization benchmark")
+    parser.add_argument("--depths", type=int, nargs="+", default=[8, 12, 16])
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measure")
+    args = parser.parse_args()
+
+    for depth in args.depths:
+        source: str = makeNested(depth, random.Random(depth))
+        expr: Expr = Parser(Scanner(Lox(), source, "regex").scanTokens()).expression()
+        data: bytes = serializer.dump(expr)
+        pickled: bytes = pickle.dumps(expr, pickle.HIGHEST_PROTOCOL)
+        parse: float = best(
+            lambda: Parser(Scanner(Lox(), source, "regex").scanTokens()).expression(),
+            args.repeat,
+        )
+        dump: float = best(lambda: serializer.dump(expr), args.repeat)
+        load: float = best(lambda: serializer.load(data), args.repeat)
+        unpickle: float = best(lambda: pickle.loads(pickled), args.repeat)
+        print(
+            f"{len(source):>9} chars: {len(data):>9} bytes ({len(pickled)} pickled), "
+            f"parse {parse * 1000:8.2f}ms, dump {dump * 1000:8.2f}ms, "
+            f"load {load * 1000:8.2f}ms ({parse / load:.1f}x), "
+            f"unpickle {unpickle * 1000:8.2f}ms"
+        )
@@ -0,0 +1,72 @@
+# Latency of a request to a running plox server against a cold run of the
+# CLI on the same script, run with: python -m bench.bench_server
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from bench.bench_parser import makeExpression
+from client import PloxClient
+
+PLOX: Path = Path(__file__).resolve().parent.parent / "plox.py"
+
+
+def percentiles(latencies: List[float]) -> str:
+    latencies = sorted(latencies)
+    median: float = latencies[len(latencies) // 2]
+    tail: float = latencies[int(len(latencies) * 0.99)]
+    return f"median {median * 1000:8.3f}ms, p99 {tail * 1000:8.3f}ms"
+
+
+def waitFor(path: str, server: subprocess.Popen) -> None:
+    while not os.path.exists(path):
+        if server.poll() is not None:
+            raise RuntimeError("The server exited")
+        time.sleep(0.01)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Server latency benchmark")
+    parser.add_argument("--terms", type=int, default=50, help="Operands of the script")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--cold", type=int, default=20, help="CLI runs")
+    args = parser.parse_args()
+
+    source: str = makeExpression(args.terms)
+    with tempfile.TemporaryDirectory() as directory:
+        script_file: str = os.path.join(directory, "bench.lox")
+        with open(script_file, "w") as f:
+            f.write(source)
+
+        cold: List[float] = []
+        for _ in range(args.cold):
+            begin: float = time.perf_counter()
+            subprocess.run(
+                [sys.executable, PLOX, "--no-cache", "--output", "ast", script_file],
+                stdout=subprocess.DEVNULL,
+                check=True,
+            )
+            cold.append(time.perf_counter() - begin)
+        print(f"cold CLI: {percentiles(cold)}")
+
+        path: str = os.path.join(directory, "plox.sock")
+        server: subprocess.Popen = subprocess.Popen(
+            [sys.executable, PLOX, "--serve", path, "--jobs", "1"]
+        )
+        try:
+            waitFor(path, server)
+            with PloxClient(path) as client:
+                warm: List[float] = []
+                for _ in range(args.requests):
+                    begin = time.perf_counter()
+                    response = client.print(source)
+                    warm.append(time.perf_counter() - begin)
+                    assert response["ok"], response
+            print(f"server:   {percentiles(warm)}")
+        finally:
+            server.terminate()
+            server.wait()
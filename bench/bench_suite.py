@@ -0,0 +1,143 @@
+# Scanning, parsing and printing throughput on the synthetic corpus, run with:
+# python -m bench.bench_suite --json results.json [--compare baseline.json]
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from astprinter import AstPrinter
+from bench.corpus import EXPRESSIONS, WORKLOADS, generate
+from expr import Expr
+from loxtoken import Token
+from optimizer import countNodes
+from parser import Parser
+from plox import Lox
+from rpnprinter import RpnPrinter
+from scanner import Scanner
+from version import PLOX_VERSION
+
+# Slowdown over the compared run reported as a regression
+REGRESSION: float = 1.10
+
+
+def measure(action: Callable[[], object], repeat: int) -> tuple[float, int]:
+    """Best time over repeat runs and peak memory of one more traced run"""
+    best: float = float("inf")
+    for _ in range(repeat):
+        begin: float = time.perf_counter()
+        action()
+        best = min(best, time.perf_counter() - begin)
+    # Traced apart, tracemalloc slows down the allocations a lot
+    tracemalloc.start()
+    action()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def runWorkload(workload: str, size: int, seed: int, repeat: int) -> List[Dict]:
+    source: str = generate(workload, size, seed)
+    tokens: List[Token] = Scanner(Lox(), source, "regex").scanTokens()
+    actions: Dict[str, Callable[[], object]] = {
+        "scan": lambda: Scanner(Lox(), source).scanTokens()
+    }
+    nodes: int = 0
+    if workload in EXPRESSIONS:
+        expr: Expr = Parser(tokens).expression()
+        nodes = countNodes(expr)
+        actions["parse"] = lambda: Parser(tokens).expression()
+        actions["ast"] = lambda: AstPrinter().print(expr)
+        actions["rpn"] = lambda: RpnPrinter().print(expr)
+
+    results: List[Dict] = []
+    for phase, action in actions.items():
+        seconds, peak = measure(action, repeat)
+        results.append(
+            {
+                "workload": workload,
+                "size": size,
+                "phase": phase,
+                "chars": len(source),
+                "tokens": len(tokens),
+                "nodes": nodes,
+                "seconds": seconds,
+                "tokensPerSecond": len(tokens) / seconds,
+                # The scanner builds no node
+                "nodesPerSecond": nodes / seconds if phase != "scan" else 0.0,
+                "peakBytes": peak,
+            }
+        )
+    return results
+
+
+def compare(results: List[Dict], baseline: List[Dict]) -> int:
+    """Print the ratios to a previous run, return the number of regressions"""
+    previous: Dict[tuple, Dict] = {
+        (result["workload"], result["size"], result["phase"]): result
+        for result in baseline
+    }
+    regressions: int = 0
+    for result in results:
+        old: Dict | None = previous.get(
+            (result["workload"], result["size"], result["phase"])
+        )
+        if old is None:
+            continue
+        ratio: float = result["seconds"] / old["seconds"]
+        marker: str = ""
+        if ratio > REGRESSION:
+            marker = "  << regression"
+            regressions += 1
+        print(
+            f"{result['workload']:>9} {result['size']:>8} {result['phase']:>6}: "
+            f"{ratio:6.2f}x time, "
+            f"{result['peakBytes'] / max(old['peakBytes'], 1):6.2f}x memory{marker}"
+        )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark suite on a synthetic corpus")
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=WORKLOADS)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measure")
+    parser.add_argument("--json", type=str, help="Write the results to this file")
+    parser.add_argument("--compare", type=str, help="Results of a previous run")
+    args = parser.parse_args()
+
+    results: List[Dict] = []
+    for workload in args.workloads:
+        for size in args.sizes:
+            for result in runWorkload(workload, size, args.seed, args.repeat):
+                results.append(result)
+                print(
+                    f"{workload:>9} {size:>8} {result['phase']:>6}: "
+                    f"{result['seconds'] * 1000:9.2f}ms, "
+                    f"{result['tokensPerSecond']:12.0f} tokens/s, "
+                    f"{result['nodesPerSecond']:12.0f} nodes/s, "
+                    f"peak {result['peakBytes'] / 1024:9.1f}KiB"
+                )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "version": PLOX_VERSION,
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "seed": args.seed,
+                    "repeat": args.repeat,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+    if args.compare:
+        with open(args.compare) as f:
+            baseline: List[Dict] = json.load(f)["results"]
+        if compare(results, baseline):
+            sys.exit(1)
@@ -0,0 +1,33 @@
+# Memory per token of a Token list against a TokenBuffer, run with:
+# python -m bench.bench_tokens
+import argparse
+import tracemalloc
+from typing import Callable
+
+from bench.bench_scanner import makeSource
+from plox import Lox
+from scanner import Scanner
+
+
+def measure(build: Callable[[], object]) -> tuple[object, int]:
+    """Return the built object and the memory it still holds"""
+    tracemalloc.start()
+    result: object = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Token storage memory benchmark")
+    parser.add_argument("--copies", type=int, default=500, help="Copies of test.lox")
+    args = parser.parse_args()
+
+    source: str = makeSource(args.copies)
+    tokens, listBytes = measure(lambda: Scanner(Lox(), source, "regex").scanTokens())
+    buffer, bufferBytes = measure(lambda: Scanner(Lox(), source, "regex").scanBuffer())
+    count: int = len(tokens)
+    assert count == len(buffer)
+    print(f"{count} tokens")
+    print(f"  List[Token]: {listBytes / count:6.1f} bytes/token")
+    print(f"  TokenBuffer: {bufferBytes / count:6.1f} bytes/token")
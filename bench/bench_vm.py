@@ -0,0 +1,44 @@
+# Evaluations/sec of the bytecode VM against the tree-walking Interpreter,
+# run with: python -m bench.bench_vm
+import argparse
+import time
+from typing import Any, Callable
+
+from expr import Expr
+from interpreter import Interpreter
+from parser import Parser
+from plox import Lox
+from scanner import Scanner
+from vm import VM, Chunk, Compiler
+
+EXPRESSION: str = '(1 + 2.5) * 3 >= -4 / (5 - 6) != !(nil == false) == ("a" + "b" == "ab")'
+
+
+def parse(source: str) -> Expr:
+    return Parser(Scanner(Lox(), source).iterTokens()).expression()
+
+
+def timeLoop(evaluate: Callable[[], Any], count: int) -> float:
+    begin: float = time.perf_counter()
+    for _ in range(count):
+        evaluate()
+    return time.perf_counter() - begin
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bytecode VM benchmark")
+    parser.add_argument("--count", type=int, default=100000, help="Evaluations")
+    parser.add_argument("--expression", type=str, default=EXPRESSION)
+    args = parser.parse_args()
+
+    expr: Expr = parse(args.expression)
+    chunk: Chunk = Compiler().compile(expr)
+    interpreter: Interpreter = Interpreter()
+    vm: VM = VM()
+    assert interpreter.evaluate(expr) == vm.run(chunk)
+
+    walking: float = timeLoop(lambda: interpreter.evaluate(expr), args.count)
+    running: float = timeLoop(lambda: vm.run(chunk), args.count)
+    print(f"{args.expression}: {len(chunk.code)} bytecodes")
+    print(f"Tree-walking: {args.count / walking:12,.0f} evaluations/sec")
+    print(f"Bytecode VM:  {args.count / running:12,.0f} evaluations/sec (x{walking / running:.2f})")
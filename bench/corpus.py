@@ -0,0 +1,140 @@
+"""
+Seeded generator of synthetic Lox sources for the benchmarks. The same
+(workload, size, seed) always gives the same source, size is roughly the
+number of tokens.
+
+Expression workloads can be parsed and printed, the script ones (comments,
+classes) are only scanned. The nesting of the expressions is bounded so the
+recursive parser can handle every size.
+"""
+import random
+from typing import Callable, Dict, List
+
+EXPRESSIONS: List[str] = ["deep", "wide", "strings"]
+SCRIPTS: List[str] = ["comments", "classes"]
+WORKLOADS: List[str] = EXPRESSIONS + SCRIPTS
+
+# Deepest nesting of groups and unary operators in an expression
+MAX_NESTING: int = 60
+
+BINARY_OPERATORS: List[str] = "== != < <= > >= + - * /".split()
+WORDS: List[str] = "meat bread drink who toast jam coffee egg bacon tea".split()
+
+
+def operand(rng: random.Random) -> str:
+    return rng.choice(
+        [str(rng.randint(0, 999)), f"{rng.random() * 100:.3f}", "true", "false", "nil"]
+    )
+
+
+def balanced(operands: List[str], rng: random.Random) -> str:
+    """Join the operands in a balanced tree of grouped binary operations"""
+    while len(operands) > 1:
+        paired: List[str] = []
+        for index in range(0, len(operands) - 1, 2):
+            operator: str = rng.choice(BINARY_OPERATORS)
+            paired.append(f"({operands[index]} {operator} {operands[index + 1]})")
+        if len(operands) % 2:
+            paired.append(operands[-1])
+        operands = paired
+    return operands[0]
+
+
+def deep(size: int, rng: random.Random) -> str:
+    """Chains of nested groups and unary operators, MAX_NESTING deep"""
+    chains: List[str] = []
+    tokens: int = 0
+    while tokens < size:
+        chain: str = operand(rng)
+        for _ in range(rng.randint(MAX_NESTING // 2, MAX_NESTING)):
+            match rng.randrange(3):
+                case 0:
+                    chain = f"({chain})"
+                case 1:
+                    chain = rng.choice("-!") + chain
+                case _:
+                    operator: str = rng.choice(BINARY_OPERATORS)
+                    chain = f"({chain} {operator} {operand(rng)})"
+        chains.append(chain)
+        tokens += chain.count(" ") + chain.count("(") * 2 + 1
+    return balanced(chains, rng)
+
+
+def wide(size: int, rng: random.Random) -> str:
+    """Many operands, each precedence level used without grouping"""
+    operands: List[str] = []
+    for _ in range(max(1, size // 32)):
+        terms: List[str] = [operand(rng)]
+        for _ in range(15):
+            terms.append(rng.choice(BINARY_OPERATORS))
+            terms.append(rng.choice(["", "-", "!"]) + operand(rng))
+        operands.append(" ".join(terms))
+    return balanced(operands, rng)
+
+
+def strings(size: int, rng: random.Random) -> str:
+    """Concatenations of long string literals, some spanning lines"""
+    operands: List[str] = []
+    for _ in range(max(1, size // 4)):
+        text: List[str] = rng.choices(WORDS, k=rng.randint(20, 200))
+        if rng.random() < 0.2:
+            text.insert(rng.randrange(len(text)), "\n")
+        operands.append(f'"{" ".join(text)}" + "{rng.choice(WORDS)}"')
+    return balanced(operands, rng)
+
+
+def comments(size: int, rng: random.Random) -> str:
+    """Statements buried in line and nested block comments"""
+    lines: List[str] = []
+    tokens: int = 0
+    while tokens < size:
+        match rng.randrange(4):
+            case 0:
+                lines.append("// " + " ".join(rng.choices(WORDS, k=12)))
+            case 1:
+                body: str = "\n".join(" ".join(rng.choices(WORDS, k=8)) for _ in range(4))
+                lines.append(f"/* {body} /* nested {rng.choice(WORDS)} */ */")
+            case _:
+                lines.append(f"print {operand(rng)} + {operand(rng)}; // trailing")
+                tokens += 5
+    return "\n".join(lines)
+
+
+def classes(size: int, rng: random.Random) -> str:
+    """Identifier heavy class declarations like the ones of test.lox"""
+    chunks: List[str] = []
+    tokens: int = 0
+    index: int = 0
+    while tokens < size:
+        fields: List[str] = rng.sample(WORDS, 3)
+        parent: str = f" < Class{index - 1}" if index and rng.random() < 0.5 else ""
+        chunks.append(
+            f"class Class{index}{parent} {{\n"
+            f"    init({', '.join(fields)}) {{\n"
+            + "".join(f"        this.{field} = {field};\n" for field in fields)
+            + "    }\n\n"
+            f"    serve(who) {{\n"
+            f'        print "Enjoy your " + this.{fields[0]} + " and " '
+            f'+ this.{fields[1]} + ", " + who + ".";\n'
+            "    }\n"
+            "}\n"
+        )
+        tokens += 70
+        index += 1
+    return "\n".join(chunks)
+
+
+GENERATORS: Dict[str, Callable[[int, random.Random], str]] = {
+    "deep": deep,
+    "wide": wide,
+    "strings": strings,
+    "comments": comments,
+    "classes": classes,
+}
+
+
+def generate(workload: str, size: int, seed: int = 0) -> str:
+    """Source of about size tokens for one of the WORKLOADS"""
+    # The size is part of the seed so each size is an independent sample
+    rng: random.Random = random.Random(f"{workload}:{size}:{seed}")
+    return GENERATORS[workload](size, rng)
@@ -0,0 +1,218 @@
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+from array import array
+from typing import List, Set, Tuple
+
+from expr import Expr
+from serializer import dump, load
+from tokenbuffer import TokenBuffer
+from version import PLOX_VERSION
+
+# Bumped when the layout of the entries changes
+CACHE_FORMAT: int = 4
+CACHE_SUFFIX: str = ".loxc"
+
+# (line, where, message, offset) of an error to report again when loading an
+# entry, the offset is -1 when unknown
+Diagnostic = Tuple[int, str, str, int]
+
+
+# Cache directories that couldn't be written by this process, the runs go on
+# without storing their entries and the failure is only told once
+unwritable: Set[str] = set()
+
+
+def defaultCacheDir() -> str:
+    base: str = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "plox")
+
+
+class CacheEntry:
+    """Scanner output and Parser result of a source, an entry only needed for
+    its tokens isn't parsed"""
+
+    def __init__(
+        self,
+        buffer: TokenBuffer,
+        scanErrors: List[Diagnostic],
+        expr: Expr | None,
+        parseError: Diagnostic | None,
+        parsed: bool = True,
+    ):
+        self.buffer: TokenBuffer = buffer
+        self.scanErrors: List[Diagnostic] = scanErrors
+        self.expr: Expr | None = expr
+        self.parseError: Diagnostic | None = parseError
+        self.parsed: bool = parsed
+
+
+class RecordingLox:
+    """Given to the Scanner instead of the Lox instance to keep its errors"""
+
+    def __init__(self):
+        self.errors: List[Diagnostic] = []
+
+    def error(self, line: int, msg: str, offset: int = -1) -> None:
+        self.errors.append((line, "", msg, offset))
+
+
+class ScriptCache:
+    """
+    Content addressed cache of the scanned and parsed scripts, like the .pyc
+    files. An entry is keyed by a hash of the source and the plox version and
+    stores the token offsets (the lexemes are sliced from the source again),
+    the errors to report and the parsed tree. Writes are atomic and the least
+    recently used entries are evicted when the directory grows over maxBytes.
+    """
+
+    def __init__(self, directory: str | None = None, maxBytes: int = 64 << 20):
+        self.directory: str = directory or defaultCacheDir()
+        self.maxBytes: int = maxBytes
+
+    def key(self, source: str) -> str:
+        digest = hashlib.sha256(f"{PLOX_VERSION}\0{CACHE_FORMAT}\0".encode())
+        digest.update(source.encode("utf-8", "surrogatepass"))
+        return digest.hexdigest()
+
+    def path(self, source: str) -> str:
+        return os.path.join(self.directory, self.key(source) + CACHE_SUFFIX)
+
+    def load(self, source: str) -> CacheEntry | None:
+        path: str = self.path(source)
+        try:
+            with open(path, "rb") as f:
+                payload: bytes = f.read()
+            entry: CacheEntry = self.decode(source, payload)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, EOFError, TypeError):
+            # Corrupted or foreign entry, rebuilt by the caller
+            self.remove(path)
+            return None
+        # Mark as recently used for the eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def store(self, source: str, entry: CacheEntry) -> None:
+        """Best effort, a cache that can't be written (read only or full disk,
+        path taken by a file) is only warned about and left alone"""
+        if self.directory in unwritable:
+            return
+        payload: bytes = self.encode(entry)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Write aside then rename so readers never see a partial entry
+            fd, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(payload)
+                os.replace(temporary, self.path(source))
+            except BaseException:
+                self.remove(temporary)
+                raise
+            self.evict()
+        except OSError as e:
+            self.disable(e)
+
+    def prepare(self) -> bool:
+        """Create the directory ahead of the writes, False once warned when it
+        can't be, before handing the cache to worker processes which would
+        each warn"""
+        if self.directory in unwritable:
+            return False
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError as e:
+            self.disable(e)
+            return False
+        return True
+
+    def disable(self, error: OSError) -> None:
+        unwritable.add(self.directory)
+        print(
+            f"Warning: can't write the cache in {self.directory}: {error.strerror}",
+            file=sys.stderr,
+        )
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until under maxBytes"""
+        entries: List[Tuple[float, int, str]] = []
+        total: int = 0
+        with os.scandir(self.directory) as scan:
+            for item in scan:
+                if item.name.endswith(CACHE_SUFFIX):
+                    try:
+                        stat: os.stat_result = item.stat()
+                    except FileNotFoundError:
+                        # Already evicted by another process sharing the cache
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, item.path))
+                    total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.maxBytes:
+                break
+            self.remove(path)
+            total -= size
+
+    def clear(self) -> None:
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith(CACHE_SUFFIX):
+                    self.remove(os.path.join(self.directory, name))
+
+    def remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def encode(self, entry: CacheEntry) -> bytes:
+        buffer: TokenBuffer = entry.buffer
+        tree: bytes | None = None
+        if entry.expr is not None:
+            tree = dump(entry.expr)
+        return marshal.dumps(
+            (
+                CACHE_FORMAT,
+                buffer.types.tobytes(),
+                buffer.starts.tobytes(),
+                buffer.ends.tobytes(),
+                buffer.lines.tobytes(),
+                buffer.literals,
+                entry.scanErrors,
+                entry.parseError,
+                entry.parsed,
+                tree,
+            )
+        )
+
+    def decode(self, source: str, payload: bytes) -> CacheEntry:
+        (
+            format,
+            types,
+            starts,
+            ends,
+            lines,
+            literals,
+            scanErrors,
+            parseError,
+            parsed,
+            tree,
+        ) = marshal.loads(payload)
+        if format != CACHE_FORMAT:
+            raise ValueError("Unknown cache entry format")
+        buffer: TokenBuffer = TokenBuffer(source)
+        buffer.types = array("B", types)
+        buffer.starts = array("q", starts)
+        buffer.ends = array("q", ends)
+        buffer.lines = array("I", lines)
+        buffer.literals = literals
+        expr: Expr | None = load(tree) if tree is not None else None
+        return CacheEntry(buffer, scanErrors, expr, parseError, parsed)
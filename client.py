@@ -0,0 +1,95 @@
+import argparse
+import base64
+import json
+import socket
+import sys
+from typing import Any, Dict, List
+
+import serializer
+from expr import Expr
+
+# Same as server.OPERATIONS, not imported to keep the client start up short
+OPERATIONS: List[str] = ["tokenize", "parse", "print"]
+
+
+class PloxClient:
+    """Blocking client of a PloxServer, one connection for many requests"""
+
+    def __init__(self, path: str):
+        self.socket: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(path)
+        self.stream = self.socket.makefile("rwb")
+        self.requests: int = 0
+
+    def request(self, operation: str, source: str, **fields: Any) -> Dict[str, Any]:
+        self.requests += 1
+        request: Dict[str, Any] = {
+            "id": self.requests,
+            "op": operation,
+            "source": source,
+            **fields,
+        }
+        self.stream.write(json.dumps(request).encode() + b"\n")
+        self.stream.flush()
+        line: bytes = self.stream.readline()
+        if not line:
+            raise ConnectionError("The server closed the connection")
+        return json.loads(line)
+
+    def tokenize(self, source: str) -> Dict[str, Any]:
+        return self.request("tokenize", source)
+
+    def parse(self, source: str) -> Expr | None:
+        """Parsed tree of the source, None when it has errors"""
+        response: Dict[str, Any] = self.request("parse", source)
+        if not response["ok"]:
+            raise RuntimeError(response["error"])
+        if response["result"] is None:
+            return None
+        return serializer.load(base64.b64decode(response["result"]))
+
+    def print(self, source: str, printer: str = "ast") -> Dict[str, Any]:
+        return self.request("print", source, printer=printer)
+
+    def close(self) -> None:
+        self.stream.close()
+        self.socket.close()
+
+    def __enter__(self) -> "PloxClient":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Client of a plox server")
+    parser.add_argument("--socket", type=str, required=True, help="Server socket")
+    parser.add_argument("operation", choices=OPERATIONS)
+    parser.add_argument("script", type=str, help="Lox script, - for stdin")
+    parser.add_argument("--printer", choices=["ast", "rpn"], default="ast")
+    args = parser.parse_args()
+
+    if args.script == "-":
+        source: str = sys.stdin.read()
+    else:
+        with open(args.script) as f:
+            source = f.read()
+    with PloxClient(args.socket) as client:
+        fields: Dict[str, Any] = {"printer": args.printer} if args.operation == "print" else {}
+        response: Dict[str, Any] = client.request(args.operation, source, **fields)
+    if not response["ok"]:
+        print(response["error"], file=sys.stderr)
+        exit(70)
+    for error in response["errors"]:
+        where: str = f"line {error['line']}"
+        if error["column"] is not None:
+            where += f", column {error['column']}"
+        print(f"[{where}] Error {error['where']}: {error['message']}", file=sys.stderr)
+    if args.operation == "tokenize":
+        for token in response["result"]:
+            print(" ".join(map(str, token)))
+    elif response["result"] is not None:
+        print(response["result"])
+    if response["errors"]:
+        exit(65)
@@ -1,14 +1,54 @@
 from __future__ import annotations
 from loxtoken import Token
-from typing import Any
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+# Kind tag of each node class
+BINARY: int = 0
+GROUPING: int = 1
+LITERAL: int = 2
+UNARY: int = 3
 
 class Expr:
+    __slots__ = ()
 
     def accept(self,visitor:Visitor) -> Any:
         raise NotImplementedError("Should be implemented")
 
 class Visitor:
 
+    # Visit function of each node class met, one dict per visitor class
+    handlers: Dict[type, Callable[[Visitor, Expr], Any]] = {}
+
+    def __init_subclass__(cls, **kwargs: Any):
+        super().__init_subclass__(**kwargs)
+        cls.handlers = {}
+
+    def visit(self, expr: Expr) -> Any:
+        """Same as expr.accept(self) with a single lookup of the visit method"""
+        handler: Callable[[Visitor, Expr], Any] | None = self.handlers.get(type(expr))
+        if handler is None:
+            handler = type(self).handlerOf(type(expr))
+        return handler(self, expr)
+
+    @classmethod
+    def handlerOf(cls, nodeType: type) -> Callable[[Visitor, Expr], Any]:
+        """Visit function of a node class, the classes unknown to the tables
+        or overriding accept go through accept"""
+        kind: int | None = getattr(nodeType, "kind", None)
+        if kind is not None and nodeType.accept is CLASSES[kind].accept:
+            handler: Callable[[Visitor, Expr], Any] = getattr(cls, VISIT_METHODS[kind])
+        else:
+            handler = acceptVisitor
+        cls.handlers[nodeType] = handler
+        return handler
+
+    def walk(self, expr: Expr) -> None:
+        """Visit every node of the tree in preorder without recursion, the
+        visit methods mustn't visit the children themselves"""
+        visit: Callable[[Expr], Any] = self.visit
+        for node in preorder(expr):
+            visit(node)
+
     def visitBinaryExpr(self,expr:Binary) -> Any:
         raise NotImplementedError("Should be implemented")
 
@@ -22,16 +62,18 @@ class Visitor:
         raise NotImplementedError("Should be implemented")
 
 class Binary(Expr):
+    __slots__ = ("left","operator","right")
+    kind = BINARY
 
     def __init__(self,left:Expr,operator:Token,right:Expr):
-        self.left = left
-        self.operator = operator
-        self.right = right
+        self.left,self.operator,self.right = left,operator,right
 
     def accept(self,visitor:Visitor):
         return visitor.visitBinaryExpr(self)
 
 class Grouping(Expr):
+    __slots__ = ("expression",)
+    kind = GROUPING
 
     def __init__(self,expression:Expr):
         self.expression = expression
@@ -40,6 +82,8 @@ class Grouping(Expr):
         return visitor.visitGroupingExpr(self)
 
 class Literal(Expr):
+    __slots__ = ("value",)
+    kind = LITERAL
 
     def __init__(self,value:object):
         self.value = value
@@ -48,11 +92,40 @@ class Literal(Expr):
         return visitor.visitLiteralExpr(self)
 
 class Unary(Expr):
+    __slots__ = ("operator","right")
+    kind = UNARY
 
     def __init__(self,operator:Token,right:Expr):
-        self.operator = operator
-        self.right = right
+        self.operator,self.right = operator,right
 
     def accept(self,visitor:Visitor):
         return visitor.visitUnaryExpr(self)
 
+
+# Kind of each node class, subclasses have the kind of their base
+KINDS: Dict[type, int] = {Binary: BINARY, Grouping: GROUPING, Literal: LITERAL, Unary: UNARY}
+# Class of each kind
+CLASSES: Tuple[type, ...] = (Binary, Grouping, Literal, Unary)
+# Visitor method of each kind
+VISIT_METHODS: Tuple[str, ...] = ("visitBinaryExpr", "visitGroupingExpr", "visitLiteralExpr", "visitUnaryExpr")
+# Child fields of each kind, from the last one
+CHILDREN: Tuple[Tuple[str, ...], ...] = (("right", "left"), ("expression",), (), ("right",))
+
+
+def acceptVisitor(visitor: Visitor, expr: Expr) -> Any:
+    return expr.accept(visitor)
+
+
+def preorder(expr: Expr) -> Iterator[Expr]:
+    """Nodes of a tree in preorder, with an explicit stack so deep trees are
+    fine. The nodes without a kind are leaves."""
+    stack: List[Expr] = [expr]
+    push = stack.append
+    pop = stack.pop
+    while stack:
+        node: Expr = pop()
+        yield node
+        kind: int | None = getattr(node, "kind", None)
+        if kind is not None:
+            for name in CHILDREN[kind]:
+                push(getattr(node, name))
@@ -0,0 +1,91 @@
+import operator
+from typing import Any, Callable, Dict
+
+from expr import Binary, Expr, Grouping, Literal, Unary, Visitor
+from interpreter import NUMBER_TYPES, LoxRuntimeError, divide, isEqual, isTruthy
+from loxtoken import Token, TokenType
+
+# A compiled expression, calling it evaluates the expression
+Closure = Callable[[], Any]
+
+# Binary operators only defined on numbers
+NumberOperators: Dict[TokenType, Callable[[Any, Any], Any]] = {
+    TokenType.MINUS: operator.sub,
+    TokenType.STAR: operator.mul,
+    TokenType.SLASH: divide,
+    TokenType.GREATER: operator.gt,
+    TokenType.GREATER_EQUAL: operator.ge,
+    TokenType.LESS: operator.lt,
+    TokenType.LESS_EQUAL: operator.le,
+}
+
+
+class ExprCompiler(Visitor):
+    """Turn each node of an expression into a nested Python closure once, the
+    closures capture their children so evaluating does no visitor dispatch"""
+
+    def compile(self, expr: Expr) -> Closure:
+        return expr.accept(self)
+
+    # Implement the Visitor interface
+    def visitBinaryExpr(self, expr: Binary) -> Closure:
+        left: Closure = expr.left.accept(self)
+        right: Closure = expr.right.accept(self)
+        token: Token = expr.operator
+        numbers: frozenset = NUMBER_TYPES
+
+        match token.type:
+            case TokenType.PLUS:
+
+                def add() -> Any:
+                    a = left()
+                    b = right()
+                    if type(a) in numbers and type(b) in numbers:
+                        return a + b
+                    if type(a) is str and type(b) is str:
+                        return a + b
+                    raise LoxRuntimeError(
+                        token, "Operands must be two numbers or two strings."
+                    )
+
+                return add
+            case TokenType.EQUAL_EQUAL:
+                return lambda: isEqual(left(), right())
+            case TokenType.BANG_EQUAL:
+                return lambda: not isEqual(left(), right())
+
+        function: Callable[[Any, Any], Any] = NumberOperators[token.type]
+
+        def arithmetic() -> Any:
+            a = left()
+            b = right()
+            if type(a) not in numbers or type(b) not in numbers:
+                raise LoxRuntimeError(token, "Operands must be numbers.")
+            return function(a, b)
+
+        return arithmetic
+
+    def visitGroupingExpr(self, expr: Grouping) -> Closure:
+        # The group has no runtime effect, reuse the inner closure
+        return expr.expression.accept(self)
+
+    def visitLiteralExpr(self, expr: Literal) -> Closure:
+        value: object = expr.value
+        return lambda: value
+
+    def visitUnaryExpr(self, expr: Unary) -> Closure:
+        right: Closure = expr.right.accept(self)
+        token: Token = expr.operator
+
+        if token.type == TokenType.BANG:
+            return lambda: not isTruthy(right())
+
+        numbers: frozenset = NUMBER_TYPES
+
+        def negate() -> Any:
+            value = right()
+            if type(value) not in numbers:
+                raise LoxRuntimeError(token, "Operand must be a number.")
+            return -value
+
+        return negate
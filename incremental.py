@@ -0,0 +1,130 @@
+from array import array
+from bisect import bisect_left
+from typing import Tuple
+
+from scanner import Scanner
+from tokenbuffer import TokenBuffer, TokenCodes
+
+
+class IncrementalScanner:
+    """
+    Keep the TokenBuffer of a source up to date through edits. Only the tokens
+    between the nearest safe restart point before the edit and the point where
+    the new tokens line up with the old ones again are scanned, the offsets and
+    lines of the following tokens are shifted.
+
+    A token start is always a safe point: the scanner is then outside of any
+    string or (nested) block comment and its state is only the offset and the
+    line. Errors are only reported for the scanned part.
+    """
+
+    def __init__(self, lox, source: str):
+        self.lox = lox
+        self.buffer: TokenBuffer = Scanner(lox, source, "regex").scanBuffer()
+        # Number of tokens scanned by the last edit
+        self.rescanned: int = len(self.buffer)
+        # Tokens [first, oldEnd) of the previous buffer were replaced by the
+        # tokens [first, newEnd) of the current one in the last edit
+        self.changed: Tuple[int, int, int] = (0, 0, len(self.buffer))
+
+    @property
+    def source(self) -> str:
+        return self.buffer.source
+
+    def edit(self, offset: int, deleted: int, inserted: str) -> TokenBuffer:
+        """Replace deleted chars at offset by the inserted text"""
+        old: TokenBuffer = self.buffer
+        source: str = old.source[:offset] + inserted
+        source += old.source[offset + deleted :]
+        delta: int = len(inserted) - deleted
+        # First offset after the edit in the new source
+        editEnd: int = offset + len(inserted)
+
+        # The scanner looks at most one char after a lexeme ("1." + digit), the
+        # tokens ending before that are not affected by the edit
+        kept: int = min(bisect_left(old.ends, offset - 1), len(old) - 1)
+
+        buffer: TokenBuffer = TokenBuffer(source)
+        buffer.types = old.types[:kept]
+        buffer.starts = old.starts[:kept]
+        buffer.ends = old.ends[:kept]
+        buffer.lines = old.lines[:kept]
+        buffer.literals = {
+            index: literal for index, literal in old.literals.items() if index < kept
+        }
+
+        scanner: Scanner = Scanner(self.lox, source, "regex")
+        if kept:
+            scanner.current = old.ends[kept - 1]
+            scanner.line = old.lines[kept - 1]
+
+        self.rescanned = 0
+        for token in scanner.iterTokens():
+            start: int = scanner.start
+            # After the edit, a new token starting where an old one started
+            # means the rest of the stream is the same
+            if start >= editEnd:
+                synced: int = bisect_left(old.starts, start - delta)
+                if (
+                    synced < len(old)
+                    and old.starts[synced] == start - delta
+                    and old.types[synced] == TokenCodes[token.type]
+                ):
+                    lines: int = token.line - old.lines[synced]
+                    self.changed = (kept, synced, len(buffer))
+                    self.appendShifted(buffer, synced, delta, lines)
+                    break
+            self.rescanned += 1
+            buffer.append(
+                token.type, start, scanner.current, token.line, token.literal
+            )
+        else:
+            self.changed = (kept, len(old), len(buffer))
+
+        self.buffer = buffer
+        return buffer
+
+    def appendShifted(
+        self, buffer: TokenBuffer, first: int, delta: int, lines: int
+    ) -> None:
+        """Append the old tokens from first on, moved by delta chars and lines"""
+        old: TokenBuffer = self.buffer
+        moved: int = len(buffer) - first
+        buffer.types.extend(old.types[first:])
+        buffer.starts.extend(array("q", map(delta.__add__, old.starts[first:])))
+        buffer.ends.extend(array("q", map(delta.__add__, old.ends[first:])))
+        buffer.lines.extend(array("I", map(lines.__add__, old.lines[first:])))
+        for index, literal in old.literals.items():
+            if index >= first:
+                buffer.literals[index + moved] = literal
+
+
+if __name__ == "__main__":
+    import random
+
+    class SilentLox:
+        def error(self, line: int, msg: str, offset: int = -1) -> None:
+            pass
+
+    # Randomized differential test against a full rescan
+    pieces = ['"', "/*", "*/", "//", "\n", " ", "1", ".", "5", "a", "class", "="]
+    pieces += ["!", "(", "é"]
+    rng: random.Random = random.Random(0)
+    for run in range(2000):
+        source: str = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 60)))
+        incremental: IncrementalScanner = IncrementalScanner(SilentLox(), source)
+        for step in range(10):
+            offset: int = rng.randint(0, len(source))
+            deleted: int = rng.randint(0, min(3, len(source) - offset))
+            inserted: str = "".join(rng.choices(pieces, k=rng.randint(0, 3)))
+            source = source[:offset] + inserted + source[offset + deleted :]
+            got = incremental.edit(offset, deleted, inserted)
+            expected = Scanner(SilentLox(), source, "regex").scanBuffer()
+            assert got.source == source
+            assert [
+                (t.type, t.lexeme, t.literal, t.line, got.starts[t.index]) for t in got
+            ] == [
+                (t.type, t.lexeme, t.literal, t.line, expected.starts[t.index])
+                for t in expected
+            ], (source, offset, deleted, inserted)
+    print("Incremental scanning matches full rescans")
@@ -0,0 +1,206 @@
+from typing import Tuple
+
+from expr import Binary, Expr, Grouping, Literal, Unary
+from loxtoken import Token, TokenType
+from parser import ParseError
+from prattparser import INFIX_POWER, PREFIX_POWER, PREFIX_TYPES
+from tokenbuffer import TokenBuffer
+
+# Binding power of the literals and groups, nothing can split them
+PRIMARY_POWER: int = PREFIX_POWER + 1
+
+# Nodes keeping their token range. The range is stored as a number of tokens
+# (width) and the start is computed while walking down the tree, so a reused
+# subtree never has to be updated when tokens are inserted before it.
+
+
+class RangedBinary(Binary):
+    __slots__ = ("width",)
+
+
+class RangedGrouping(Grouping):
+    __slots__ = ("width",)
+
+
+class RangedLiteral(Literal):
+    __slots__ = ("width",)
+
+
+class RangedUnary(Unary):
+    __slots__ = ("width",)
+
+
+def power(node: Expr) -> int:
+    """Binding power of the operator at the top of a node"""
+    if isinstance(node, Binary):
+        return INFIX_POWER[node.operator.type]
+    if isinstance(node, Unary):
+        return PREFIX_POWER
+    return PRIMARY_POWER
+
+
+class IncrementalParser:
+    """
+    Parser keeping the tree of the previous parse and reusing its untouched
+    subtrees after the tokens changed in one region (see
+    IncrementalScanner.changed). It uses precedence climbing so a reused node
+    is simply the left operand the climbing goes on from.
+
+    A node of the previous tree is reused when all its tokens are outside the
+    changed region and the token after it can't take its rightmost operand
+    (an operator binding tighter than the node's one). The operator tokens of
+    a reused node are the ones of the parse that created it.
+    """
+
+    def __init__(self, buffer: TokenBuffer):
+        self.buffer: TokenBuffer = buffer
+        self.pos: int = 0
+        self.tree: Expr | None = None
+        # Changed region of the last edit, see reparse
+        self.changed: Tuple[int, int, int] = (0, 0, 0)
+        # Nodes taken from the previous tree by the last parse
+        self.reused: int = 0
+
+    def expression(self) -> Expr:
+        """Parse the whole buffer from scratch"""
+        self.tree = None
+        return self.parse()
+
+    def reparse(self, buffer: TokenBuffer, changed: Tuple[int, int, int]) -> Expr:
+        """Parse the new buffer where the tokens [first, oldEnd) of the previous
+        one were replaced by [first, newEnd), changed is (first, oldEnd, newEnd)"""
+        self.buffer = buffer
+        self.changed = changed
+        return self.parse()
+
+    def parse(self) -> Expr:
+        self.pos = 0
+        self.reused = 0
+        try:
+            self.tree = self.climb(1)
+        except ParseError:
+            # The next parse can't rely on this tree anymore
+            self.tree = None
+            raise
+        return self.tree
+
+    def climb(self, minPower: int) -> Expr:
+        left: Expr | None = self.reuse(minPower)
+        if left is None:
+            left = self.unary()
+
+        typeAt = self.buffer.typeAt
+        while True:
+            operatorPower: int | None = INFIX_POWER.get(typeAt(self.pos))
+            if operatorPower is None or operatorPower < minPower:
+                return left
+            operator: Token = self.advance()
+            right: Expr = self.climb(operatorPower + 1)
+            node: RangedBinary = RangedBinary(left, operator, right)
+            node.width = left.width + 1 + right.width
+            left = node
+
+    def unary(self) -> Expr:
+        if self.buffer.typeAt(self.pos) in PREFIX_TYPES:
+            operator: Token = self.advance()
+            right: Expr = self.climb(PREFIX_POWER)
+            node: RangedUnary = RangedUnary(operator, right)
+            node.width = 1 + right.width
+            return node
+        return self.primary()
+
+    def primary(self) -> Expr:
+        token: Token = self.token()
+        match token.type:
+            case TokenType.FALSE:
+                literal: RangedLiteral = RangedLiteral(False)
+            case TokenType.TRUE:
+                literal = RangedLiteral(True)
+            case TokenType.NIL:
+                literal = RangedLiteral(None)
+            case TokenType.NUMBER | TokenType.STRING:
+                literal = RangedLiteral(token.literal)
+            case TokenType.LEFT_PAREN:
+                self.pos += 1
+                expr: Expr = self.climb(1)
+                if self.buffer.typeAt(self.pos) != TokenType.RIGHT_PAREN:
+                    raise ParseError(self.token(), "Expect ')' after expression.")
+                self.pos += 1
+                group: RangedGrouping = RangedGrouping(expr)
+                group.width = expr.width + 2
+                return group
+            case _:
+                raise ParseError(token, "Expect expression.")
+        self.pos += 1
+        literal.width = 1
+        return literal
+
+    def token(self) -> Token:
+        index: int = self.pos
+        buffer: TokenBuffer = self.buffer
+        return Token(
+            buffer.typeAt(index),
+            buffer.lexemeAt(index),
+            buffer.literalAt(index),
+            buffer.lines[index],
+            buffer.starts[index],
+        )
+
+    def advance(self) -> Token:
+        token: Token = self.token()
+        if token.type != TokenType.EOF:
+            self.pos += 1
+        return token
+
+    def reuse(self, minPower: int) -> Expr | None:
+        """Outermost node of the previous tree that can be the result of
+        climbing at the current position with minPower"""
+        node: Expr | None = self.tree
+        if node is None:
+            return None
+        first, oldEnd, newEnd = self.changed
+        if self.pos < first:
+            target: int = self.pos
+        elif self.pos >= newEnd:
+            target = self.pos - newEnd + oldEnd
+        else:
+            return None
+
+        # Walk down the previous tree to the nodes starting at target
+        start: int = 0
+        while node is not None:
+            if (
+                start == target
+                and power(node) >= minPower
+                and (target >= oldEnd or target + node.width <= first)
+                and self.followedBy(node)
+            ):
+                self.pos += node.width
+                self.reused += 1
+                return node
+            node, start = self.child(node, start, target)
+        return None
+
+    def followedBy(self, node: Expr) -> bool:
+        """The token after the node can't take its rightmost operand"""
+        nextPower: int | None = INFIX_POWER.get(
+            self.buffer.typeAt(self.pos + node.width)
+        )
+        return nextPower is None or nextPower <= power(node)
+
+    def child(self, node: Expr, start: int, target: int) -> Tuple[Expr | None, int]:
+        """Child of the node (and its start) containing the target token"""
+        match node:
+            case Binary():
+                if target < start + node.left.width:
+                    return node.left, start
+                start += node.left.width + 1
+                if start <= target:
+                    return node.right, start
+            case Unary():
+                if start + 1 <= target:
+                    return node.right, start + 1
+            case Grouping():
+                if start + 1 <= target < start + node.width - 1:
+                    return node.expression, start + 1
+        return None, start
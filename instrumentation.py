@@ -0,0 +1,81 @@
+import sys
+import tracemalloc
+from collections import Counter
+from typing import Dict, Iterable, List, TextIO
+
+from expr import Expr, preorder
+from loxtoken import Token
+
+# Phases of a run, in order, as given to the hooks
+PHASES: List[str] = ["read", "load", "scan", "parse", "print"]
+
+
+class Hooks:
+    """
+    Callbacks of a Lox run, register them with Lox.addHooks. The default ones
+    do nothing. Lox only times the phases and collects the tokens and trees
+    for the hooks when some are registered, a run without hooks pays a few
+    attribute checks.
+    """
+
+    def phaseStarted(self, phase: str) -> None:
+        pass
+
+    def phaseEnded(self, phase: str, seconds: float) -> None:
+        pass
+
+    def scanned(self, tokens: Iterable[Token]) -> None:
+        pass
+
+    def parsed(self, expr: Expr) -> None:
+        pass
+
+    def reported(self, line: int, where: str, msg: str) -> None:
+        pass
+
+
+class RunStats(Hooks):
+    """Phase timers and counters of the tokens, nodes and errors of runs, with
+    the peak memory of each phase when tracemalloc is tracing"""
+
+    def __init__(self):
+        self.timers: Dict[str, float] = {}
+        self.peaks: Dict[str, int] = {}
+        self.tokens: Counter[str] = Counter()
+        self.nodes: Counter[str] = Counter()
+        self.errors: int = 0
+
+    def phaseStarted(self, phase: str) -> None:
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+    def phaseEnded(self, phase: str, seconds: float) -> None:
+        self.timers[phase] = self.timers.get(phase, 0.0) + seconds
+        if tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            self.peaks[phase] = max(self.peaks.get(phase, 0), peak)
+
+    def scanned(self, tokens: Iterable[Token]) -> None:
+        self.tokens.update(token.type.name for token in tokens)
+
+    def parsed(self, expr: Expr) -> None:
+        for node in preorder(expr):
+            self.nodes[type(node).__name__] += 1
+
+    def reported(self, line: int, where: str, msg: str) -> None:
+        self.errors += 1
+
+    def report(self, file: TextIO = sys.stderr) -> None:
+        print("-- stats --", file=file)
+        for phase in PHASES:
+            if phase in self.timers:
+                line: str = f"{phase:<8}{self.timers[phase] * 1000:10.3f}ms"
+                if phase in self.peaks:
+                    line += f"{self.peaks[phase] / 1024:12.1f}KiB peak"
+                print(line, file=file)
+        for name, counter in (("tokens", self.tokens), ("nodes", self.nodes)):
+            counts: str = ", ".join(
+                f"{kind} {count}" for kind, count in counter.most_common()
+            )
+            print(f"{name:<8}{counter.total():>10} {counts}".rstrip(), file=file)
+        print(f"{'errors':<8}{self.errors:>10}", file=file)
@@ -0,0 +1,145 @@
+import math
+from typing import Any
+
+from expr import Binary, Expr, Grouping, Literal, Unary, Visitor
+from loxtoken import Token, TokenType
+
+# Python types used for Lox numbers, the scanner only produces floats but
+# hand built trees often use ints. bool is not one of them.
+NUMBER_TYPES: frozenset = frozenset((float, int))
+
+
+class LoxRuntimeError(Exception):
+    """Raised when an expression can't be evaluated"""
+
+    def __init__(self, token: Token, message: str):
+        super().__init__(message)
+        self.token: Token = token
+        self.message: str = message
+
+
+def isTruthy(value: object) -> bool:
+    """nil and false are falsey, everything else is truthy"""
+    return value is not None and value is not False
+
+
+def isEqual(left: object, right: object) -> bool:
+    """Lox equality, values of different types are never equal"""
+    if left is None:
+        return right is None
+    if (type(left) is bool) != (type(right) is bool):
+        return False
+    return left == right
+
+
+def isNumber(value: object) -> bool:
+    return type(value) in NUMBER_TYPES
+
+
+def divide(left: float, right: float) -> float:
+    """IEEE 754 division like the Java doubles of jlox, no ZeroDivisionError"""
+    try:
+        return left / right
+    except ZeroDivisionError:
+        if left == 0 or math.isnan(left):
+            return math.nan
+        return math.copysign(math.inf, left) * math.copysign(1.0, right)
+
+
+def stringify(value: object) -> str:
+    """Lox representation of a value"""
+    if value is None:
+        return "nil"
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if type(value) is float and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def checkNumberOperands(operator: Token, *operands: object) -> None:
+    for operand in operands:
+        if type(operand) not in NUMBER_TYPES:
+            if len(operands) == 1:
+                raise LoxRuntimeError(operator, "Operand must be a number.")
+            raise LoxRuntimeError(operator, "Operands must be numbers.")
+
+
+class Interpreter(Visitor):
+    """Tree-walking evaluator of the expressions"""
+
+    def evaluate(self, expr: Expr) -> Any:
+        return expr.accept(self)
+
+    # Implement the Visitor interface
+    def visitBinaryExpr(self, expr: Binary) -> Any:
+        left: Any = self.evaluate(expr.left)
+        right: Any = self.evaluate(expr.right)
+        operator: Token = expr.operator
+
+        match operator.type:
+            case TokenType.PLUS:
+                if isNumber(left) and isNumber(right):
+                    return left + right
+                if type(left) is str and type(right) is str:
+                    return left + right
+                raise LoxRuntimeError(
+                    operator, "Operands must be two numbers or two strings."
+                )
+            case TokenType.MINUS:
+                checkNumberOperands(operator, left, right)
+                return left - right
+            case TokenType.STAR:
+                checkNumberOperands(operator, left, right)
+                return left * right
+            case TokenType.SLASH:
+                checkNumberOperands(operator, left, right)
+                return divide(left, right)
+            case TokenType.GREATER:
+                checkNumberOperands(operator, left, right)
+                return left > right
+            case TokenType.GREATER_EQUAL:
+                checkNumberOperands(operator, left, right)
+                return left >= right
+            case TokenType.LESS:
+                checkNumberOperands(operator, left, right)
+                return left < right
+            case TokenType.LESS_EQUAL:
+                checkNumberOperands(operator, left, right)
+                return left <= right
+            case TokenType.EQUAL_EQUAL:
+                return isEqual(left, right)
+            case TokenType.BANG_EQUAL:
+                return not isEqual(left, right)
+        raise LoxRuntimeError(operator, "Unknown binary operator.")
+
+    def visitGroupingExpr(self, expr: Grouping) -> Any:
+        return self.evaluate(expr.expression)
+
+    def visitLiteralExpr(self, expr: Literal) -> Any:
+        return expr.value
+
+    def visitUnaryExpr(self, expr: Unary) -> Any:
+        right: Any = self.evaluate(expr.right)
+
+        match expr.operator.type:
+            case TokenType.MINUS:
+                checkNumberOperands(expr.operator, right)
+                return -right
+            case TokenType.BANG:
+                return not isTruthy(right)
+        raise LoxRuntimeError(expr.operator, "Unknown unary operator.")
+
+
+if __name__ == "__main__":
+
+    # Test of the Interpreter: -123 * (45.67)
+    expression: Expr = Binary(
+        Unary(Token(TokenType.MINUS, "-", None, 1), Literal(123)),
+        Token(TokenType.STAR, "*", None, 1),
+        Grouping(Literal(45.67)),
+    )
+
+    print(stringify(Interpreter().evaluate(expression)))
@@ -0,0 +1,65 @@
+from array import array
+from bisect import bisect_right
+from mmap import mmap
+from typing import Tuple
+
+
+class LineIndex:
+    """
+    Offsets of the beginning of every line of a source, built once with a
+    bulk search of the newlines. The line and column of any offset are then
+    found by bisection, so the scanner doesn't need to track columns.
+    Lines and columns start at 1, columns count chars for str and UTF-8
+    sources alike: the offsets of UTF-8 sources are in bytes so the start of
+    their line is decoded to count its chars.
+    """
+
+    __slots__ = ("source", "starts")
+
+    def __init__(self, source: str | bytes | mmap):
+        self.source: str | bytes | mmap = source
+        newline: str | bytes = "\n" if isinstance(source, str) else b"\n"
+        self.starts: array = array("q", [0])
+        find = source.find
+        append = self.starts.append
+        found: int = find(newline)
+        while found != -1:
+            append(found + 1)
+            found = find(newline, found + 1)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def line(self, offset: int) -> int:
+        return bisect_right(self.starts, offset)
+
+    def position(self, offset: int) -> Tuple[int, int]:
+        """(line, column) of an offset"""
+        line: int = bisect_right(self.starts, offset)
+        start: int = self.starts[line - 1]
+        if isinstance(self.source, str):
+            return line, offset - start + 1
+        return line, len(self.text(start, offset)) + 1
+
+    def lineText(self, line: int) -> str:
+        """Text of a line without its newline"""
+        start: int = self.starts[line - 1]
+        if line < len(self.starts):
+            end: int = self.starts[line] - 1
+        else:
+            end = len(self.source)
+        return self.text(start, end).rstrip("\r")
+
+    def text(self, start: int, end: int) -> str:
+        text: str | bytes = self.source[start:end]
+        if not isinstance(text, str):
+            text = bytes(text).decode("utf-8", "replace")
+        return text
+
+    def snippet(self, offset: int, length: int = 1) -> str:
+        """Line of an offset with a caret mark under length chars from it"""
+        line: int = self.line(offset)
+        prefix: str = self.text(self.starts[line - 1], offset)
+        # Keep the tabs so the mark lines up with the text
+        margin: str = "".join(c if c == "\t" else " " for c in prefix)
+        return f"{self.lineText(line)}\n{margin}{'^' * max(1, length)}"
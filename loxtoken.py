@@ -77,16 +77,38 @@ LoxKeyword: Dict[str, TokenType] = {
 }
 
 
-class Token:
+class BaseToken:
+    """
+    Fields and printing of a token without any storage, a Token stores its
+    fields and a TokenView reads them from its TokenBuffer
+    """
+
+    __slots__ = ()
+
+    type: TokenType
+    lexeme: str
+    literal: object
+    line: int
+    offset: int
+
+    def __str__(self):
+        return f"{self.type} {self.lexeme} {self.literal}"
+
+
+class Token(BaseToken):
     """
     Placeholder class that contains all the info for a given Token
     """
 
-    def __init__(self, type: TokenType, lexeme: str, literal: object, line: int):
+    __slots__ = ("type", "lexeme", "literal", "line", "offset")
+
+    def __init__(
+        self, type: TokenType, lexeme: str, literal: object, line: int, offset: int = -1
+    ):
         self.type = type
         self.lexeme = lexeme
         self.literal = literal
         self.line = line
-
-    def __str__(self):
-        return f"{self.type} {self.lexeme} {self.literal}"
+        # Offset of the lexeme in the source, -1 when unknown. The column is
+        # found from it with a LineIndex when needed
+        self.offset = offset
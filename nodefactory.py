@@ -0,0 +1,154 @@
+import math
+from typing import Dict, Hashable, List, Tuple
+
+from expr import Binary, Expr, Grouping, Literal, Unary
+from loxtoken import Token
+
+
+class NodeFactory:
+    """Builds the nodes for the Parser, the default one simply allocates a
+    new node for every occurrence"""
+
+    binary = Binary
+    grouping = Grouping
+    literal = Literal
+    unary = Unary
+
+
+class FrozenNode:
+    """Mixin forbidding to modify a node once built, interned and cached nodes
+    are shared"""
+
+    __slots__ = ()
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError(f"{type(self).__name__} is shared and immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is shared and immutable")
+
+
+class InternedBinary(FrozenNode, Binary):
+    __slots__ = ()
+
+
+class InternedGrouping(FrozenNode, Grouping):
+    __slots__ = ()
+
+
+class InternedLiteral(FrozenNode, Literal):
+    __slots__ = ()
+
+
+class InternedUnary(FrozenNode, Unary):
+    __slots__ = ()
+
+
+class FrozenBinary(FrozenNode, Binary):
+    __slots__ = ()
+
+
+class FrozenGrouping(FrozenNode, Grouping):
+    __slots__ = ()
+
+
+class FrozenLiteral(FrozenNode, Literal):
+    __slots__ = ()
+
+
+class FrozenUnary(FrozenNode, Unary):
+    __slots__ = ()
+
+
+class FrozenToken(FrozenNode, Token):
+    __slots__ = ()
+
+
+def build(cls: type, **fields: object) -> Expr:
+    node: Expr = object.__new__(cls)
+    for name, value in fields.items():
+        object.__setattr__(node, name, value)
+    return node
+
+
+class FrozenNodeFactory(NodeFactory):
+    """Builds immutable nodes, with immutable copies of the operator tokens,
+    for the trees shared between callers like the ones of a ParseCache"""
+
+    def binary(self, left: Expr, operator: Token, right: Expr) -> Binary:
+        return build(
+            FrozenBinary, left=left, operator=freeze(operator), right=right
+        )
+
+    def grouping(self, expression: Expr) -> Grouping:
+        return build(FrozenGrouping, expression=expression)
+
+    def literal(self, value: object) -> Literal:
+        return build(FrozenLiteral, value=value)
+
+    def unary(self, operator: Token, right: Expr) -> Unary:
+        return build(FrozenUnary, operator=freeze(operator), right=right)
+
+
+def freeze(token: Token) -> Token:
+    return build(
+        FrozenToken,
+        type=token.type,
+        lexeme=token.lexeme,
+        literal=token.literal,
+        line=token.line,
+        offset=token.offset,
+    )
+
+
+class InterningNodeFactory(NodeFactory):
+    """
+    Hash-consing factory: structurally identical subexpressions are built once
+    and shared, so two interned nodes are equal if and only if they are the
+    same object. The children are interned first so a node is keyed on the
+    identity of its children. The operator token of the first occurrence is
+    kept, only its type and lexeme are part of the structure.
+    """
+
+    def __init__(self):
+        self.table: Dict[Hashable, Expr] = {}
+        # Number of times each interned node was asked for
+        self.uses: Dict[Expr, int] = {}
+
+    def intern(self, key: Hashable, cls: type, **fields: object) -> Expr:
+        node: Expr | None = self.table.get(key)
+        if node is None:
+            node = build(cls, **fields)
+            self.table[key] = node
+            self.uses[node] = 1
+        else:
+            self.uses[node] += 1
+        return node
+
+    def binary(self, left: Expr, operator: Token, right: Expr) -> Binary:
+        key: Tuple = (Binary, left, operator.type, operator.lexeme, right)
+        return self.intern(
+            key, InternedBinary, left=left, operator=operator, right=right
+        )
+
+    def grouping(self, expression: Expr) -> Grouping:
+        key: Tuple = (Grouping, expression)
+        return self.intern(key, InternedGrouping, expression=expression)
+
+    def literal(self, value: object) -> Literal:
+        # 1.0 and true are equal for Python, -0.0 and 0.0 too
+        key: Tuple = (Literal, type(value), value)
+        if type(value) is float:
+            key += (math.copysign(1.0, value),)
+        return self.intern(key, InternedLiteral, value=value)
+
+    def unary(self, operator: Token, right: Expr) -> Unary:
+        key: Tuple = (Unary, operator.type, operator.lexeme, right)
+        return self.intern(key, InternedUnary, operator=operator, right=right)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def commonSubexpressions(self) -> List[Expr]:
+        """Interned nodes that occurred more than once"""
+        return [node for node, count in self.uses.items() if count > 1]
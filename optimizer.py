@@ -0,0 +1,189 @@
+from typing import List
+
+from expr import Binary, Expr, Grouping, Literal, Unary, Visitor
+from interpreter import NUMBER_TYPES, Interpreter, LoxRuntimeError
+from loxtoken import Token, TokenType
+
+# Operators whose result is always a number (or a runtime error)
+NUMBER_RESULTS: frozenset = frozenset(
+    (TokenType.MINUS, TokenType.STAR, TokenType.SLASH)
+)
+# Operators whose result is always a boolean
+BOOL_RESULTS: frozenset = frozenset(
+    (
+        TokenType.BANG,
+        TokenType.GREATER,
+        TokenType.GREATER_EQUAL,
+        TokenType.LESS,
+        TokenType.LESS_EQUAL,
+        TokenType.EQUAL_EQUAL,
+        TokenType.BANG_EQUAL,
+    )
+)
+
+
+class OptimizerStats:
+    """What the ConstantFolder did to the last optimized expression"""
+
+    def __init__(self):
+        self.nodesBefore: int = 0
+        self.nodesAfter: int = 0
+        self.folded: int = 0  # Binary/Unary nodes replaced by a Literal
+        self.groupings: int = 0  # Grouping nodes dropped
+        self.simplified: int = 0  # Algebraic identities applied
+
+    @property
+    def removed(self) -> int:
+        return self.nodesBefore - self.nodesAfter
+
+    def __str__(self):
+        return (
+            f"{self.nodesBefore} -> {self.nodesAfter} nodes ({self.removed} removed): "
+            f"{self.folded} folded, {self.groupings} groupings, "
+            f"{self.simplified} simplified"
+        )
+
+
+def countNodes(expr: Expr) -> int:
+    count: int = 0
+    stack: List[Expr] = [expr]
+    while stack:
+        node: Expr = stack.pop()
+        count += 1
+        match node:
+            case Binary():
+                stack.append(node.left)
+                stack.append(node.right)
+            case Grouping():
+                stack.append(node.expression)
+            case Unary():
+                stack.append(node.right)
+    return count
+
+
+def isNumberResult(expr: Expr) -> bool:
+    """True if the expression can only give a number (or fail)"""
+    match expr:
+        case Literal():
+            return type(expr.value) in NUMBER_TYPES
+        case Grouping():
+            return isNumberResult(expr.expression)
+        case Unary() | Binary():
+            return expr.operator.type in NUMBER_RESULTS
+    return False
+
+
+def isBoolResult(expr: Expr) -> bool:
+    """True if the expression can only give a boolean (or fail)"""
+    match expr:
+        case Literal():
+            return type(expr.value) is bool
+        case Grouping():
+            return isBoolResult(expr.expression)
+        case Unary() | Binary():
+            return expr.operator.type in BOOL_RESULTS
+    return False
+
+
+def isConstant(expr: Expr, value: float) -> bool:
+    return (
+        isinstance(expr, Literal)
+        and type(expr.value) in NUMBER_TYPES
+        and expr.value == value
+    )
+
+
+class ConstantFolder(Visitor):
+    """Optimization pass folding the constant Binary/Unary nodes into Literal,
+    dropping the Grouping nodes and applying the algebraic identities that
+    keep the Lox semantics (runtime errors included)"""
+
+    def __init__(self):
+        self.interpreter: Interpreter = Interpreter()
+        self.stats: OptimizerStats = OptimizerStats()
+
+    def optimize(self, expr: Expr) -> Expr:
+        self.stats = OptimizerStats()
+        optimized: Expr = expr.accept(self)
+        self.stats.nodesAfter = countNodes(optimized)
+        return optimized
+
+    def fold(self, expr: Expr) -> Expr:
+        """Evaluate a node with constant children, failing nodes are kept so
+        that the error still happens at runtime"""
+        try:
+            value: object = self.interpreter.evaluate(expr)
+        except LoxRuntimeError:
+            return expr
+        self.stats.folded += 1
+        return Literal(value)
+
+    # Implement the Visitor interface
+    def visitBinaryExpr(self, expr: Binary) -> Expr:
+        self.stats.nodesBefore += 1
+        left: Expr = expr.left.accept(self)
+        right: Expr = expr.right.accept(self)
+        if left is not expr.left or right is not expr.right:
+            expr = Binary(left, expr.operator, right)
+        if isinstance(left, Literal) and isinstance(right, Literal):
+            return self.fold(expr)
+
+        # Identities only hold for numbers, e + 0 is not used as -0 + 0 is 0
+        match expr.operator.type:
+            case TokenType.MINUS if isConstant(right, 0) and isNumberResult(left):
+                return self.simplify(left)
+            case TokenType.STAR | TokenType.SLASH if isConstant(
+                right, 1
+            ) and isNumberResult(left):
+                return self.simplify(left)
+            case TokenType.STAR if isConstant(left, 1) and isNumberResult(right):
+                return self.simplify(right)
+        return expr
+
+    def visitGroupingExpr(self, expr: Grouping) -> Expr:
+        self.stats.nodesBefore += 1
+        self.stats.groupings += 1
+        # The tree shape already encodes the grouping
+        return expr.expression.accept(self)
+
+    def visitLiteralExpr(self, expr: Literal) -> Expr:
+        self.stats.nodesBefore += 1
+        return expr
+
+    def visitUnaryExpr(self, expr: Unary) -> Expr:
+        self.stats.nodesBefore += 1
+        right: Expr = expr.right.accept(self)
+        if right is not expr.right:
+            expr = Unary(expr.operator, right)
+        if isinstance(right, Literal):
+            return self.fold(expr)
+
+        # -(-e) is e for numbers and !(!e) is e for booleans
+        operator: Token = expr.operator
+        if isinstance(right, Unary) and right.operator.type == operator.type:
+            match operator.type:
+                case TokenType.MINUS if isNumberResult(right.right):
+                    return self.simplify(right.right)
+                case TokenType.BANG if isBoolResult(right.right):
+                    return self.simplify(right.right)
+        return expr
+
+    def simplify(self, expr: Expr) -> Expr:
+        self.stats.simplified += 1
+        return expr
+
+
+if __name__ == "__main__":
+    from astprinter import AstPrinter
+    from parser import Parser
+    from plox import Lox
+    from scanner import Scanner
+
+    # Test of the ConstantFolder
+    for source in ['(1 + 2) * 3', '-(-(-"a" * 2))', '!!(1 < 2 == nil)', '"a" + "b"']:
+        expression: Expr = Parser(Scanner(Lox(), source).iterTokens()).expression()
+        folder: ConstantFolder = ConstantFolder()
+        optimized: Expr = folder.optimize(expression)
+        printer: AstPrinter = AstPrinter()
+        print(f"{printer.print(expression)} => {printer.print(optimized)}")
+        print(f"    {folder.stats}")
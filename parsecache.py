@@ -0,0 +1,123 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Tuple
+
+from cache import CacheEntry
+from expr import preorder
+from tokenbuffer import TokenBuffer, freeze
+
+
+class ParseCache:
+    """
+    In memory LRU cache of the scanned and parsed sources, for the services
+    running the same few snippets again and again (rules loaded from a
+    configuration, the REPL). An entry is keyed by the source text and the
+    least recently used ones are evicted when there are more than maxEntries
+    or they hold more than maxBytes. All the methods are thread safe.
+
+    The entries are shared by all the callers, so they must not change: the
+    trees are built by a FrozenNodeFactory, the errors are kept as tuples and
+    the tokens in a FrozenTokenBuffer. get returns a new CacheEntry holding
+    them so rebinding its fields is fine.
+    """
+
+    def __init__(self, maxEntries: int = 1024, maxBytes: int = 32 << 20):
+        self.maxEntries: int = maxEntries
+        self.maxBytes: int = maxBytes
+        # Source to its entry and the bytes it holds, most recently used last
+        self.entries: OrderedDict[str, Tuple[CacheEntry, int]] = OrderedDict()
+        self.bytes: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __reduce__(self) -> Tuple[type, Tuple[int, int]]:
+        # An other process gets its own empty cache with the same budgets
+        return ParseCache, (self.maxEntries, self.maxBytes)
+
+    def get(self, source: str) -> CacheEntry | None:
+        with self.lock:
+            found: Tuple[CacheEntry, int] | None = self.entries.get(source)
+            if found is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(source)
+            self.hits += 1
+        return unshared(found[0])
+
+    def put(self, source: str, entry: CacheEntry) -> CacheEntry:
+        """Store the entry of a source, returns it as get would"""
+        shared: CacheEntry = CacheEntry(
+            freeze(entry.buffer),
+            tuple(entry.scanErrors),
+            entry.expr,
+            entry.parseError,
+            entry.parsed,
+        )
+        size: int = entrySize(source, shared)
+        with self.lock:
+            previous: Tuple[CacheEntry, int] | None = self.entries.pop(source, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            if size > self.maxBytes:
+                # Would evict everything and still not fit
+                return unshared(shared)
+            self.entries[source] = (shared, size)
+            self.bytes += size
+            while len(self.entries) > self.maxEntries or self.bytes > self.maxBytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+        return unshared(shared)
+
+    def fetch(self, source: str, analyze: Callable[[str], CacheEntry]) -> CacheEntry:
+        """Entry of a source, analyzed and stored on a miss. The analysis is
+        done out of the lock, threads missing the same source both do it."""
+        entry: CacheEntry | None = self.get(source)
+        if entry is None:
+            entry = self.put(source, analyze(source))
+        return entry
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Counters since the creation of the cache and its current size"""
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+            }
+
+
+def unshared(entry: CacheEntry) -> CacheEntry:
+    """New CacheEntry holding the shared fields of a cached one"""
+    return CacheEntry(
+        entry.buffer, entry.scanErrors, entry.expr, entry.parseError, entry.parsed
+    )
+
+
+def entrySize(source: str, entry: CacheEntry) -> int:
+    """Approximate bytes held by an entry: its source, the tokens and the
+    nodes of the tree"""
+    size: int = sys.getsizeof(source)
+    buffer: TokenBuffer = entry.buffer
+    for column in (buffer.types, buffer.starts, buffer.ends, buffer.lines):
+        size += column.itemsize * len(column)
+    # The read only mapping of a frozen buffer is a proxy, count its dict
+    size += sys.getsizeof(dict(buffer.literals))
+    size += sum(map(sys.getsizeof, buffer.literals.values()))
+    if entry.expr is not None:
+        for node in preorder(entry.expr):
+            size += sys.getsizeof(node)
+    return size
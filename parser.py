@@ -1,15 +1,42 @@
-from typing import List
+from collections import deque
+from typing import Deque, Iterable, Iterator
 from loxtoken import TokenType,Token
-from expr import Binary, Expr, Grouping, Literal, Unary
+from expr import Expr
+from nodefactory import NodeFactory
+
+class ParseError(Exception):
+    """Raised when the tokens don't follow the grammar"""
+    def __init__(self,token:Token,message:str) -> None:
+        super().__init__(message)
+        self.token:Token = token
+        self.message:str = message
+
+# Operators of each precedence level, checked with a single set membership
+EQUALITY_TYPES: frozenset = frozenset((TokenType.BANG_EQUAL,TokenType.EQUAL_EQUAL))
+COMPARISON_TYPES: frozenset = frozenset((TokenType.GREATER,TokenType.GREATER_EQUAL,TokenType.LESS,TokenType.LESS_EQUAL))
+TERM_TYPES: frozenset = frozenset((TokenType.PLUS,TokenType.MINUS))
+FACTOR_TYPES: frozenset = frozenset((TokenType.SLASH,TokenType.STAR))
+UNARY_TYPES: frozenset = frozenset((TokenType.BANG,TokenType.MINUS))
 
 class Parser:
     """Lox code parser
     We implement the grammar rules in a top-down/recursive desecent parser"""
-    def __init__(self,tokens:List[Token]) -> None:
-        # Flat sequences of tokens
-        self.tokens: List[Token] = tokens
-        # Current token
+    def __init__(self,tokens:Iterable[Token],factory:NodeFactory | None = None) -> None:
+        # Sequence of tokens, a list or a lazy stream like Scanner.iterTokens()
+        self.tokens: Iterator[Token] = iter(tokens)
+        # Tokens pulled from the stream after the current one
+        self.lookahead: Deque[Token] = deque()
+        # Current token, kept in an attribute as it is checked for every rule
+        first: Token | None = next(self.tokens, None)
+        if first is None:
+            raise ValueError("No token to parse, the stream must end with an EOF token")
+        self.token: Token = first
+        # Last consumed token
+        self.last: Token | None = None
+        # Number of consumed tokens
         self.current:int = 0
+        # Builds the nodes, see InterningNodeFactory to share identical subtrees
+        self.factory:NodeFactory = factory if factory is not None else NodeFactory()
 
     def expression(self) -> Expr:
         return self.equality()
@@ -17,97 +44,113 @@ class Parser:
     def equality(self) -> Expr:
         expr:Expr = self.comparison()
 
-        while self.match(TokenType.BANG_EQUAL,TokenType.EQUAL_EQUAL):
-            operator:Token = self.previous()
+        while self.token.type in EQUALITY_TYPES:
+            operator:Token = self.advance()
             right:Expr = self.comparison()
-            expr = Binary(expr,operator,right)
-        
+            expr = self.factory.binary(expr,operator,right)
+
         return expr
 
     def comparison(self) -> Expr:
         expr:Expr = self.term()
 
-        while self.match(TokenType.GREATER,TokenType.GREATER_EQUAL,TokenType.LESS,TokenType.LESS_EQUAL):
-            operator:Token = self.previous()
+        while self.token.type in COMPARISON_TYPES:
+            operator:Token = self.advance()
             right:Expr = self.term()
-            expr = Binary(expr,operator,right)
+            expr = self.factory.binary(expr,operator,right)
 
         return expr
 
     def term(self) -> Expr:
         expr:Expr = self.factor()
 
-        while self.match(TokenType.PLUS,TokenType.MINUS):
-            operator:Token = self.previous()
+        while self.token.type in TERM_TYPES:
+            operator:Token = self.advance()
             right:Expr = self.factor()
-            expr = Binary(expr,operator,right)
+            expr = self.factory.binary(expr,operator,right)
 
         return expr        
 
     def factor(self) -> Expr:
         expr:Expr = self.unary()
 
-        while self.match(TokenType.SLASH,TokenType.STAR):
-            operator:Token = self.previous()
+        while self.token.type in FACTOR_TYPES:
+            operator:Token = self.advance()
             right:Expr = self.unary()
-            expr = Binary(expr,operator,right)
+            expr = self.factory.binary(expr,operator,right)
 
         return expr        
 
     def unary(self) -> Expr:
-        if self.match(TokenType.BANG,TokenType.MINUS):
-            operator:Token = self.previous()
+        if self.token.type in UNARY_TYPES:
+            operator:Token = self.advance()
             right:Expr = self.unary()
-            return Unary(operator,right)
+            return self.factory.unary(operator,right)
         
         return self.primary()
 
     def primary(self) -> Expr:
-        cur_token:TokenType = self.peek().type
-        match cur_token:
+        token:Token = self.token
+        match token.type:
             case TokenType.FALSE:
                 self.advance()
-                return Literal(False)
+                return self.factory.literal(False)
             case TokenType.TRUE:
                 self.advance()
-                return Literal(True)
+                return self.factory.literal(True)
             case TokenType.NIL:
                 self.advance()
-                return Literal(None)
+                return self.factory.literal(None)
             case TokenType.NUMBER | TokenType.STRING:
                 self.advance()
-                return Literal(self.previous().literal)
+                return self.factory.literal(token.literal)
             case TokenType.LEFT_PAREN:
                 self.advance()
                 expr:Expr = self.expression()
                 self.consume(TokenType.RIGHT_PAREN,"Expect ')' after expression.")
-                return Grouping(expr)
+                return self.factory.grouping(expr)
+        raise ParseError(token,"Expect expression.")
 
     #Continue on 6.3
     # Helper functions
     def match(self, *args:TokenType) -> bool:
         """Check if the current token matches any of the given TokenTypes"""
-        for type in args:
-            if self.check(type):
-                self.advance()
-                return True
+        if self.token.type in args and self.token.type != TokenType.EOF:
+            self.advance()
+            return True
         return False
     
+    def consume(self,type:TokenType,message:str) -> Token:
+        """Consume the current token if it has the expected type or fail"""
+        if self.check(type):
+            return self.advance()
+        raise ParseError(self.peek(),message)
+
     def check(self,type:TokenType) -> bool:
-        if self.isAtEnd():
-            return False
-        return self.peek().type == type
+        return self.token.type == type and type != TokenType.EOF
 
     def advance(self) -> Token:
-        if not self.isAtEnd():
+        """Consume the current token and return it"""
+        token:Token = self.token
+        if token.type != TokenType.EOF:
+            self.last = token
+            self.token = self.lookahead.popleft() if self.lookahead else next(self.tokens)
             self.current += 1
-        return self.previous()
+        return self.last
     
     def isAtEnd(self) -> bool:
-        return self.peek().type == TokenType.EOF
-
-    def peek(self) -> Token:
-        return self.tokens[self.current]
+        return self.token.type == TokenType.EOF
+
+    def peek(self,distance:int = 0) -> Token:
+        """Return the token distance positions after the current one, the stream
+        is only pulled as far as needed and the EOF token is repeated past it"""
+        if distance == 0:
+            return self.token
+        lookahead = self.lookahead
+        while len(lookahead) < distance:
+            last: Token = lookahead[-1] if lookahead else self.token
+            lookahead.append(last if last.type == TokenType.EOF else next(self.tokens))
+        return lookahead[distance - 1]
     
     def previous(self) -> Token:
-        return self.tokens[self.current - 1]
+        return self.last
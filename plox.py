@@ -1,10 +1,38 @@
 # Python lox version by hellgheast
+import cProfile
+import glob
+import io
+import mmap
+import os
 import pathlib
+import pstats
 import sys
-from typing import List
-from scanner import Scanner
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext, redirect_stderr, redirect_stdout
+from typing import ContextManager, Dict, Iterable, Iterator, List, Tuple
+from astprinter import AstPrinter
+from cache import CacheEntry, Diagnostic, RecordingLox, ScriptCache
+from expr import Expr
+from instrumentation import Hooks, RunStats
+from lineindex import LineIndex
+from loxtoken import Token, TokenType
+from nodefactory import FrozenNodeFactory, NodeFactory
+from parsecache import ParseCache
+from parser import ParseError, Parser
+from rpnprinter import RpnPrinter
+from scanner import ENGINES, Scanner
+from version import PLOX_VERSION
 import argparse
 
+# What run prints: the tokens or the parsed expression with one of the printers
+PRINTERS: Dict[str, type] = {"ast": AstPrinter, "rpn": RpnPrinter}
+OUTPUTS: List[str] = ["tokens", *PRINTERS]
+
+# Phase of a run without hooks, shared as it does nothing
+UNTIMED: ContextManager = nullcontext()
+
 
 class Lox:
     """
@@ -12,32 +40,363 @@ class Lox:
     """
 
     # TODO: Go for a static class ?
-    def __init__(self):
+    def __init__(
+        self,
+        engine: str = "match",
+        output: str = "tokens",
+        cache: ScriptCache | None = None,
+        stats: bool = False,
+        profile: bool = False,
+        parseCache: ParseCache | None = None,
+    ):
         self.hadError: bool = False
+        # Scanning engine used by run, see scanner.ENGINES
+        self.engine: str = engine
+        # What run prints, see OUTPUTS
+        self.output: str = output
+        # Cache of the scanned and parsed scripts used by runFile
+        self.cache: ScriptCache | None = cache
+        # In memory cache of the sources given to run, shared by the forks
+        self.parseCache: ParseCache | None = parseCache
+        # Print the RunStats of each file run, with a profile of the calls and
+        # the peak memory of the phases when profiling
+        self.stats: bool = stats
+        self.profile: bool = profile
+        self.hooks: List[Hooks] = []
+        # Source being run and its LineIndex, only built to locate an error
+        self.source: str | mmap.mmap | None = None
+        self.lineIndex: LineIndex | None = None
+
+    def fork(self) -> "Lox":
+        """New interpreter with the same settings, no error and no hooks"""
+        return Lox(
+            self.engine,
+            self.output,
+            self.cache,
+            self.stats,
+            self.profile,
+            self.parseCache,
+        )
+
+    def addHooks(self, hooks: Hooks) -> None:
+        self.hooks.append(hooks)
+
+    def removeHooks(self, hooks: Hooks) -> None:
+        self.hooks.remove(hooks)
+
+    def phase(self, name: str) -> ContextManager:
+        """Context of a phase of the run, only timed when there are hooks"""
+        return self.timedPhase(name) if self.hooks else UNTIMED
+
+    @contextmanager
+    def timedPhase(self, name: str) -> Iterator[None]:
+        for hooks in self.hooks:
+            hooks.phaseStarted(name)
+        begin: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed: float = time.perf_counter() - begin
+            for hooks in self.hooks:
+                hooks.phaseEnded(name, elapsed)
+
+    def scanned(self, tokens: Iterable[Token]) -> None:
+        for hooks in self.hooks:
+            hooks.scanned(tokens)
 
-    def report(self, line: int, where: str, msg: str) -> None:
-        print(f"[line {line}] Error {where}: {msg}", file=sys.stderr)
+    def parsed(self, expr: Expr) -> None:
+        for hooks in self.hooks:
+            hooks.parsed(expr)
+
+    def setSource(self, source: str | mmap.mmap | None) -> None:
+        self.source = source
+        self.lineIndex = None
+
+    def report(self, line: int, where: str, msg: str, offset: int = -1) -> None:
+        """Print an error, with its column and source line when its offset in
+        the current source is known"""
+        if offset < 0 or self.source is None:
+            print(f"[line {line}] Error {where}: {msg}", file=sys.stderr)
+        else:
+            if self.lineIndex is None:
+                self.lineIndex = LineIndex(self.source)
+            line, column = self.lineIndex.position(offset)
+            print(f"[line {line}, column {column}] Error {where}: {msg}", file=sys.stderr)
+            # Nothing to show at the end of a source ending with a newline
+            if self.lineIndex.lineText(line).strip():
+                for text in self.lineIndex.snippet(offset).splitlines():
+                    print(f"    {text}", file=sys.stderr)
         self.hadError = True
+        for hooks in self.hooks:
+            hooks.reported(line, where, msg)
+
+    def error(self, line: int, msg: str, offset: int = -1) -> None:
+        self.report(line, "", msg, offset)
+
+    def tokenError(self, token: Token, msg: str) -> None:
+        self.report(*self.tokenDiagnostic(token, msg))
 
-    def error(self, line: int, msg: str) -> None:
-        self.report(line, "", msg)
+    def tokenDiagnostic(self, token: Token, msg: str) -> Diagnostic:
+        if token.type == TokenType.EOF:
+            return (token.line, "at end", msg, token.offset)
+        return (token.line, f"at '{token.lexeme}'", msg, token.offset)
 
     def run(self, source: str) -> None:
-        scanner: Scanner = Scanner(self, source)
-        tokens: List[str] = scanner.scanTokens()
-        for token in tokens:
-            print(token)
+        self.setSource(source)
+        if self.parseCache is not None:
+            self.replay(self.analyzeCached(source, self.output != "tokens"))
+            return
+        scanner: Scanner = Scanner(self, source, self.engine)
+        if self.output == "tokens" and not self.hooks:
+            # Tokens are printed as soon as they are scanned
+            for token in scanner.iterTokens():
+                print(token)
+            return
+
+        # All the scanning errors are reported before the parsing ones, the
+        # hooks also need the phases apart
+        with self.phase("scan"):
+            tokens: List[Token] = scanner.scanTokens()
+        self.scanned(tokens)
+        if self.output == "tokens":
+            with self.phase("print"):
+                for token in tokens:
+                    print(token)
+            return
+
+        with self.phase("parse"):
+            expr: Expr | None = self.parse(tokens)
+        if expr is not None:
+            self.parsed(expr)
+        if not self.hadError:
+            with self.phase("print"):
+                self.printExpr(expr)
+
+    def parse(self, tokens: Iterable[Token]) -> Expr | None:
+        expr, error = self.parseTokens(tokens)
+        if error is not None:
+            self.report(*error)
+        return expr
+
+    def parseTokens(
+        self, tokens: Iterable[Token], factory: NodeFactory | None = None
+    ) -> Tuple[Expr | None, Diagnostic | None]:
+        """Parse the tokens, the error is returned instead of reported"""
+        parser: Parser = Parser(tokens, factory)
+        try:
+            return parser.expression(), None
+        except ParseError as e:
+            return None, self.tokenDiagnostic(e.token, e.message)
+        except RecursionError:
+            # The recursive descent can't nest deeper than the Python stack
+            return None, self.tokenDiagnostic(
+                parser.token, "Expression nested too deeply."
+            )
+
+    def printExpr(self, expr: Expr) -> None:
+        printer: AstPrinter | RpnPrinter = PRINTERS[self.output]()
+        # Streamed, big trees are never held as a single string
+        printer.write(expr, sys.stdout)
+        print()
+
+    def runCached(self, source: str) -> None:
+        """Same output as run but the scanning and parsing results are loaded
+        from the cache when the source was already seen"""
+        self.setSource(source)
+        with self.phase("load"):
+            entry: CacheEntry | None = self.cache.load(source)
+        # An entry stored without its tree is analyzed again
+        if entry is None or not entry.parsed:
+            entry = self.analyze(source)
+            self.cache.store(source, entry)
+        self.replay(entry)
+
+    def replay(self, entry: CacheEntry) -> None:
+        """Report the errors and print the output of an analyzed source"""
+        if self.hooks:
+            self.scanned(entry.buffer)
+            if entry.expr is not None:
+                self.parsed(entry.expr)
+
+        for diagnostic in entry.scanErrors:
+            self.report(*diagnostic)
+        if self.output == "tokens":
+            with self.phase("print"):
+                for token in entry.buffer:
+                    print(token)
+        elif entry.parseError is not None:
+            self.report(*entry.parseError)
+        elif not self.hadError:
+            with self.phase("print"):
+                self.printExpr(entry.expr)
+
+    def analyze(
+        self, source: str, factory: NodeFactory | None = None, parse: bool = True
+    ) -> CacheEntry:
+        """Scan and parse a source, keeping the errors instead of reporting
+        them. Without parse only the tokens are kept."""
+        recorder: RecordingLox = RecordingLox()
+        with self.phase("scan"):
+            buffer = Scanner(recorder, source, self.engine).scanBuffer()
+        if not parse:
+            return CacheEntry(buffer, recorder.errors, None, None, parsed=False)
+        with self.phase("parse"):
+            expr, parseError = self.parseTokens(buffer, factory)
+        return CacheEntry(buffer, recorder.errors, expr, parseError)
+
+    def analyzeCached(self, source: str, parse: bool = True) -> CacheEntry:
+        """Same as analyze, through the parse cache when there is one. The
+        cached trees are frozen since they are shared. An entry cached without
+        its tree is analyzed again when the tree is needed."""
+        if self.parseCache is None:
+            return self.analyze(source, parse=parse)
+        entry: CacheEntry | None = self.parseCache.get(source)
+        if entry is None or (parse and not entry.parsed):
+            entry = self.parseCache.put(
+                source, self.analyze(source, FrozenNodeFactory(), parse)
+            )
+        return entry
+
+    def runMapped(self, program: mmap.mmap) -> None:
+        """Scan the memory mapped UTF-8 bytes of a script without decoding them,
+        only the lexemes of the tokens given to the Parser are decoded"""
+        # Errors are only reported while the file is mapped
+        self.setSource(program)
+        scanner: Scanner = Scanner(self, program, "regex")
+        with self.phase("scan"):
+            buffer = scanner.scanBuffer()
+        self.scanned(buffer)
+        if self.output == "tokens":
+            self.setSource(None)
+            with self.phase("print"):
+                for token in buffer:
+                    print(token)
+            return
+
+        with self.phase("parse"):
+            expr: Expr | None = self.parse(buffer)
+        self.setSource(None)
+        if expr is not None:
+            self.parsed(expr)
+        if not self.hadError:
+            with self.phase("print"):
+                self.printExpr(expr)
+
+    def runFile(self, script_file: str, mapped: bool = False) -> None:
+        try:
+            self.processFile(script_file, mapped)
+        except ScriptReadError as e:
+            print(f"Can't read script: {e.strerror}", file=sys.stderr)
+            self.hadError = True
+        if self.hadError:
+            exit(65)
+
+    def processFile(self, script_file: str, mapped: bool = False) -> None:
+        """Run a script file, errors are only recorded in hadError"""
+        if not (self.stats or self.profile):
+            self.readFile(script_file, mapped)
+            return
+
+        stats: RunStats = RunStats()
+        profiler: cProfile.Profile | None = None
+        if self.profile:
+            profiler = cProfile.Profile()
+            tracemalloc.start()
+        self.addHooks(stats)
+        try:
+            if profiler is not None:
+                profiler.enable()
+            self.readFile(script_file, mapped)
+        finally:
+            self.removeHooks(stats)
+            if profiler is not None:
+                profiler.disable()
+                tracemalloc.stop()
+            # Printed with the diagnostics to keep the output unchanged
+            stats.report(sys.stderr)
+            if profiler is not None:
+                profile: pstats.Stats = pstats.Stats(profiler, stream=sys.stderr)
+                profile.sort_stats("cumulative").print_stats(20)
 
-    def runFile(self, script_file: str) -> None:
+    def readFile(self, script_file: str, mapped: bool) -> None:
+        if mapped:
+            with self.mapScript(script_file) as program:
+                # Reading as text translates the \r newlines, keep the text
+                # path for those scripts to get the same output
+                if program is not None and program.find(b"\r") == -1:
+                    print("Processing file..")
+                    self.runMapped(program)
+                    return
 
-        with open(script_file, "r") as f:
-            print("Processing file..")
-            program: str = f.read()
+        try:
+            with open(script_file, "r") as f:
+                print("Processing file..")
+                with self.phase("read"):
+                    program: str = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            raise ScriptReadError(script_file, e) from e
+        # The tokens are streamed as they are scanned, faster than loading
+        # them and with memory bounded by the lookahead, the cache only pays
+        # off for the outputs that parse
+        if self.cache is not None and self.output != "tokens":
+            self.runCached(program)
+        else:
             self.run(program)
-        #TODO: Might need error handling for file ?
+
+    @contextmanager
+    def mapScript(self, script_file: str) -> Iterator[mmap.mmap | None]:
+        """Read only memory map of a script, None for empty files which can't
+        be mapped"""
+        try:
+            f = open(script_file, "rb")
+        except OSError as e:
+            raise ScriptReadError(script_file, e) from e
+        with f:
+            try:
+                program: mmap.mmap | None = None
+                if os.fstat(f.fileno()).st_size > 0:
+                    program = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except OSError as e:
+                raise ScriptReadError(script_file, e) from e
+            if program is None:
+                yield None
+            else:
+                with program:
+                    yield program
+
+    def runFiles(self, scripts: List[str], jobs: int, mapped: bool = False) -> None:
+        """Run many scripts over a pool of worker processes. The output of each
+        script is printed after a header, in the order of the scripts, and its
+        diagnostics are prefixed with its path"""
+        prototype: Lox = self
+        usesCache: bool = self.cache is not None and self.output != "tokens"
+        if jobs > 1 and usesCache and not self.cache.prepare():
+            prototype = self.fork()
+            prototype.cache = None
+        prototypes: List[Lox] = [prototype] * len(scripts)
+        mappings: List[bool] = [mapped] * len(scripts)
+        if jobs <= 1:
+            self.printResults(map(processScript, scripts, prototypes, mappings))
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                # map yields the results in the order of the scripts
+                chunksize: int = max(1, len(scripts) // (jobs * 8))
+                self.printResults(
+                    executor.map(
+                        processScript, scripts, prototypes, mappings, chunksize=chunksize
+                    )
+                )
         if self.hadError:
             exit(65)
 
+    def printResults(self, results: Iterator["ScriptResult"]) -> None:
+        for result in results:
+            print(f"==> {result.script_file} <==")
+            sys.stdout.write(result.output)
+            for diagnostic in result.diagnostics.splitlines(keepends=True):
+                sys.stderr.write(f"{result.script_file}: {diagnostic}")
+            self.hadError = self.hadError or result.hadError
+
     def runPrompt(self) -> None:
         print("Launching prompt..")
         while True:
@@ -46,7 +405,11 @@ class Lox:
                 if read == "":
                     break
                 else:
-                    self.run(read)
+                    try:
+                        self.run(read)
+                    except RecursionError:
+                        # The parser reports it, printing or a hook may not
+                        self.error(1, "Expression nested too deeply.")
                     self.hadError = False
             except EOFError as e:
                 print("\n!! Exit !!")
@@ -56,6 +419,70 @@ class Lox:
                 break
 
 
+class ScriptReadError(Exception):
+    """A script file can't be opened, read or decoded, unlike the other errors
+    raised while running it"""
+
+    def __init__(self, script_file: str, error: OSError | UnicodeDecodeError):
+        strerror: str | None = (
+            error.strerror if isinstance(error, OSError) else str(error)
+        )
+        super().__init__(f"{script_file}: {strerror}")
+        self.script_file: str = script_file
+        self.strerror: str | None = strerror
+
+
+class ScriptResult:
+    """Output and diagnostics of a script run by a worker process"""
+
+    def __init__(
+        self, script_file: str, output: str, diagnostics: str, hadError: bool
+    ):
+        self.script_file: str = script_file
+        self.output: str = output
+        self.diagnostics: str = diagnostics
+        self.hadError: bool = hadError
+
+
+def processScript(script_file: str, prototype: Lox, mapped: bool) -> ScriptResult:
+    """Worker side of Lox.runFiles, the output is captured instead of printed"""
+    interpreter: Lox = prototype.fork()
+    output: io.StringIO = io.StringIO()
+    diagnostics: io.StringIO = io.StringIO()
+    with redirect_stdout(output), redirect_stderr(diagnostics):
+        try:
+            interpreter.processFile(script_file, mapped)
+        except ScriptReadError as e:
+            print(f"Can't read script: {e.strerror}", file=sys.stderr)
+            interpreter.hadError = True
+    return ScriptResult(
+        script_file, output.getvalue(), diagnostics.getvalue(), interpreter.hadError
+    )
+
+
+def collectScripts(inputs: List[str]) -> List[str]:
+    """Expand files, directories (all their .lox scripts) and glob patterns in
+    a deterministic order, an input matching nothing is a usage error"""
+    scripts: List[str] = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            found: List[str] = sorted(
+                str(path) for path in pathlib.Path(pattern).rglob("*.lox")
+            )
+        elif glob.has_magic(pattern):
+            found = sorted(
+                path for path in glob.glob(pattern, recursive=True)
+                if os.path.isfile(path)
+            )
+        else:
+            found = [pattern] if os.path.isfile(pattern) else []
+        if not found:
+            raise FileNotFoundError(f"No lox script found for {pattern}")
+        scripts.extend(found)
+    # Keep the first occurrence of the scripts given more than once
+    return list(dict.fromkeys(scripts))
+
+
 if __name__ == "__main__":
     # developer: str = "Ismail"
     # print(f"Hello world {developer}")
@@ -63,15 +490,101 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Python lox interpreter", exit_on_error=False
     )
-    parser.add_argument("--script", type=str, help="Path for a lox script file")
+    parser.add_argument(
+        "--script",
+        type=str,
+        action="append",
+        default=[],
+        help="Path for a lox script file, a directory or a glob (repeatable)",
+    )
+    parser.add_argument("scripts", nargs="*", help="More scripts, directories or globs")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes used when running many scripts",
+    )
+    parser.add_argument(
+        "--engine",
+        type=str,
+        choices=ENGINES,
+        default="match",
+        help="Scanning engine, regex is faster on big scripts",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        choices=OUTPUTS,
+        default="tokens",
+        help="Print the tokens or the parsed expression",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't use the cache of the scanned and parsed scripts, never used"
+        " for the tokens output",
+    )
+    parser.add_argument("--cache-dir", type=str, help="Directory of the cache")
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=64 << 20,
+        help="Size in bytes over which old cache entries are evicted",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print the time of the phases and counts of tokens, nodes and errors",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Like --stats with the memory peaks and a profile of the calls",
+    )
+    parser.add_argument(
+        "--serve",
+        type=str,
+        metavar="SOCKET",
+        help="Answer JSON requests on this Unix socket instead, see server.py",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=10.0, help="Longest request of the server"
+    )
+    parser.add_argument("--version", action="version", version=PLOX_VERSION)
+    parser.add_argument(
+        "--mmap",
+        action="store_true",
+        help="Memory map the script and scan its bytes without decoding them, "
+        "the cache isn't used",
+    )
     try:
         args = parser.parse_args()
     except argparse.ArgumentError as e:
         print(e)
         exit(64)
+    if args.serve:
+        import server
+
+        server.serve(args.serve, args.jobs, args.timeout)
+        exit(0)
     # If we have an input script provider do something
-    interpreter: Lox = Lox()
-    if args.script:
-        interpreter.runFile(args.script)
+    cache: ScriptCache | None = None
+    if not args.no_cache:
+        cache = ScriptCache(args.cache_dir, args.cache_size)
+    inputs: List[str] = args.script + args.scripts
+    # The prompt keeps the lines it already analyzed in memory
+    parseCache: ParseCache | None = None if inputs else ParseCache()
+    interpreter: Lox = Lox(
+        args.engine, args.output, cache, args.stats, args.profile, parseCache
+    )
+    if len(inputs) == 1 and os.path.isfile(inputs[0]):
+        interpreter.runFile(inputs[0], args.mmap)
+    elif inputs:
+        try:
+            scripts: List[str] = collectScripts(inputs)
+        except FileNotFoundError as e:
+            print(e)
+            exit(64)
+        interpreter.runFiles(scripts, args.jobs, args.mmap)
     else:
         interpreter.runPrompt()
@@ -0,0 +1,144 @@
+from itertools import chain
+from typing import Dict, List, Tuple
+
+from expr import Expr
+from loxtoken import Token, TokenType
+from parser import ParseError, Parser
+
+# Binding power of the binary operators, from grammar.md (higher binds tighter)
+INFIX_POWER: Dict[TokenType, int] = {
+    TokenType.EQUAL_EQUAL: 1,
+    TokenType.BANG_EQUAL: 1,
+    TokenType.GREATER: 2,
+    TokenType.GREATER_EQUAL: 2,
+    TokenType.LESS: 2,
+    TokenType.LESS_EQUAL: 2,
+    TokenType.PLUS: 3,
+    TokenType.MINUS: 3,
+    TokenType.SLASH: 4,
+    TokenType.STAR: 4,
+}
+# Prefix operators bind tighter than any binary one
+PREFIX_POWER: int = 5
+PREFIX_TYPES: frozenset = frozenset((TokenType.BANG, TokenType.MINUS))
+# Tokens opening an operand: the prefix operators and the groups
+OPENING_TYPES: frozenset = PREFIX_TYPES | {TokenType.LEFT_PAREN}
+# Value of the keyword literals
+LITERAL_VALUES: Dict[TokenType, object] = {
+    TokenType.FALSE: False,
+    TokenType.TRUE: True,
+    TokenType.NIL: None,
+}
+# An opening parenthesis on the operator stack, never reduced by an operator
+GROUP_POWER: int = 0
+
+# Kinds of the entries of the operator stack
+GROUP, PREFIX, INFIX = 0, 1, 2
+
+
+class PrattParser(Parser):
+    """
+    Precedence climbing parser building the same trees as Parser. Instead of
+    one recursive method per precedence level it loops over the tokens with an
+    explicit operand and operator stack, so nesting depth is only limited by
+    memory.
+    """
+
+    def expression(self) -> Expr:
+        # The hot path of Parser.advance, primary and reduce is inlined in the
+        # loop and the parser state is written back once at the end
+        if self.lookahead:
+            # Tokens already peeked at come first
+            self.tokens = chain(tuple(self.lookahead), self.tokens)
+            self.lookahead.clear()
+        pull = self.tokens.__next__
+        factory = self.factory
+        literal, grouping = factory.literal, factory.grouping
+        unary, binary = factory.unary, factory.binary
+        infixPower = INFIX_POWER.get
+        operands: List[Expr] = []
+        push = operands.append
+        # (binding power, kind, token) of the pending operators
+        operators: List[Tuple[int, int, Token]] = []
+        # Number of open parenthesis on the operator stack
+        groups: int = 0
+        token: Token = self.token
+        last: Token | None = self.last
+        consumed: int = 0
+
+        try:
+            while True:
+                # Operand position: prefix operators, groups and then a primary
+                type: TokenType = token.type
+                while type in OPENING_TYPES:
+                    if type == TokenType.LEFT_PAREN:
+                        operators.append((GROUP_POWER, GROUP, token))
+                        groups += 1
+                    else:
+                        operators.append((PREFIX_POWER, PREFIX, token))
+                    last = token
+                    token = pull()
+                    consumed += 1
+                    type = token.type
+                if type == TokenType.NUMBER or type == TokenType.STRING:
+                    push(literal(token.literal))
+                elif type in LITERAL_VALUES:
+                    push(literal(LITERAL_VALUES[type]))
+                else:
+                    raise ParseError(token, "Expect expression.")
+                last = token
+                token = pull()
+                consumed += 1
+
+                # Operator position: binary operator, closing groups or the end
+                while True:
+                    type = token.type
+                    power: int | None = infixPower(type)
+                    if power is not None:
+                        # Everything binding at least as tight is complete
+                        # (left associativity)
+                        while operators and operators[-1][0] >= power:
+                            _, kind, operator = operators.pop()
+                            right: Expr = operands.pop()
+                            if kind == PREFIX:
+                                push(unary(operator, right))
+                            else:
+                                operands[-1] = binary(operands[-1], operator, right)
+                        operators.append((power, INFIX, token))
+                        last = token
+                        token = pull()
+                        consumed += 1
+                        break
+
+                    self.reduce(operands, operators, GROUP_POWER + 1)
+                    if type == TokenType.RIGHT_PAREN and groups:
+                        operators.pop()
+                        groups -= 1
+                        operands[-1] = grouping(operands[-1])
+                        last = token
+                        token = pull()
+                        consumed += 1
+                        continue
+                    if groups:
+                        raise ParseError(token, "Expect ')' after expression.")
+                    return operands[0]
+        finally:
+            self.token = token
+            self.last = last
+            self.current += consumed
+
+    def reduce(
+        self,
+        operands: List[Expr],
+        operators: List[Tuple[int, int, Token]],
+        power: int,
+    ) -> None:
+        """Build the nodes of the pending operators binding at least as tight"""
+        factory = self.factory
+        while operators and operators[-1][0] >= power:
+            _, kind, token = operators.pop()
+            right: Expr = operands.pop()
+            if kind == PREFIX:
+                operands.append(factory.unary(token, right))
+            else:
+                operands[-1] = factory.binary(operands[-1], token, right)
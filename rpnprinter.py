@@ -1,3 +1,15 @@
+import io
+from typing import Dict, List, TextIO
+from astprinter import (
+    BINARY,
+    FLUSH_PIECES,
+    GROUPING,
+    KINDS,
+    LITERAL,
+    TEXT,
+    UNARY,
+    kindOf,
+)
 from expr import Literal, Unary, Visitor, Binary, Grouping, Expr, Token
 from loxtoken import TokenType
 
@@ -6,21 +18,57 @@ class RpnPrinter(Visitor):
     """Printer to show the nesting of the expression in RPN"""
 
     def print(self, expr: Expr) -> str:
-        return expr.accept(self)
+        output: io.StringIO = io.StringIO()
+        self.write(expr, output)
+        return output.getvalue()
 
-    def rpntransform(self, name: str, *args: Expr):
-        output: str = ""
-        for expr in args:
-            output += expr.accept(self) + " " 
-        output += name
-        return output
+    def write(self, expr: Expr, sink: TextIO) -> None:
+        """Stream the printed expression to sink, without recursion like
+        AstPrinter.write. The operands are followed by a space then the
+        operator (nothing for a group)."""
+        pieces: List[str] = []
+        append = pieces.append
+        stack: List[Expr | str] = [expr]
+        push = stack.append
+        pop = stack.pop
+        kinds: Dict[type, int] = KINDS
+        while stack:
+            item: Expr | str = pop()
+            while True:
+                kind: int | None = kinds.get(type(item))
+                if kind is None:
+                    kind = kindOf(type(item))
+                if kind == BINARY:
+                    push(" " + item.operator.lexeme)
+                    push(item.right)
+                    push(" ")
+                    item = item.left
+                elif kind == LITERAL:
+                    append(self.visitLiteralExpr(item))
+                    break
+                elif kind == TEXT:
+                    append(item)
+                    break
+                elif kind == UNARY:
+                    push(" " + item.operator.lexeme)
+                    item = item.right
+                elif kind == GROUPING:
+                    push(" ")
+                    item = item.expression
+                else:
+                    append(item.accept(self))
+                    break
+            if len(pieces) >= FLUSH_PIECES:
+                sink.write("".join(pieces))
+                pieces.clear()
+        sink.write("".join(pieces))
 
     # Implement the Visitor interface
     def visitBinaryExpr(self, expr: Binary) -> str:
-        return self.rpntransform(expr.operator.lexeme, expr.left, expr.right)
+        return self.print(expr)
 
     def visitGroupingExpr(self, expr: Grouping) -> str:
-        return self.rpntransform("", expr.expression)
+        return self.print(expr)
 
     def visitLiteralExpr(self, expr: Literal) -> str:
         if expr.value is None:
@@ -28,8 +76,7 @@ class RpnPrinter(Visitor):
         return str(expr.value)
 
     def visitUnaryExpr(self, expr: Unary) -> str:
-        # Not sure if this works..
-        return self.rpntransform(expr.operator.lexeme, expr.right)
+        return self.print(expr)
 
 
 if __name__ == "__main__":
@@ -1,24 +1,246 @@
-from typing import List
+import re
+from mmap import mmap
+from typing import Dict, Iterator, List
 
 from loxtoken import LoxKeyword, Token, TokenType
+from symboltable import (
+    KEYWORD_MAX_LENGTH,
+    KEYWORD_MIN_LENGTH,
+    KEYWORD_STARTS,
+    SymbolTable,
+)
+from tokenbuffer import TokenBuffer
+
+# Scanning engines available for the Scanner
+ENGINES: List[str] = ["match", "regex"]
+
+# Master pattern used by the regex engine, each alternative pulls a whole lexeme.
+# The order matters: comments must win over the slash and the two chars
+# operators over their one char prefix.
+LEXEME_PATTERN: re.Pattern = re.compile(
+    r"""
+    (?P<WHITESPACE>[ \t\r\n]+)
+    |(?P<IDENTIFIER>[A-Za-z_][A-Za-z0-9_]*)
+    |(?P<NUMBER>[0-9]+(?:\.[0-9]+)?)
+    |(?P<LINE_COMMENT>//[^\n]*)
+    |(?P<BLOCK_COMMENT>/\*)
+    |(?P<OPERATOR>!=|==|<=|>=|[(){},.\-+;*/!=<>])
+    |(?P<STRING>"[^"]*"?)
+    |(?P<UNEXPECTED>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# Same pattern for sources given as UTF-8 bytes, an unexpected char is a whole
+# UTF-8 sequence so errors are reported once per char like for str sources
+LEXEME_PATTERN_BYTES: re.Pattern = re.compile(
+    LEXEME_PATTERN.pattern.replace(
+        "(?P<UNEXPECTED>.)", "(?P<UNEXPECTED>[\\xc0-\\xff][\\x80-\\xbf]*|.)"
+    ).encode(),
+    re.VERBOSE | re.DOTALL,
+)
+
+# Delimiters of the nested block comments, group 1 is the opening one
+BLOCK_COMMENT_PATTERN: re.Pattern = re.compile(r"(/\*)|\*/")
+BLOCK_COMMENT_PATTERN_BYTES: re.Pattern = re.compile(rb"(/\*)|\*/")
+
+# Operator lexeme to TokenType, the values of the enum are the lexemes
+LoxOperator: Dict[str, TokenType] = {
+    type.value: type
+    for type in TokenType
+    if type.value in "!= == <= >= ( ) { } , . - + ; * / ! = < >".split()
+}
+
+
+# Bytes lexemes to TokenType for the bytes sources
+LoxKeywordBytes: Dict[bytes, TokenType] = {
+    keyword.encode(): type for keyword, type in LoxKeyword.items()
+}
+LoxOperatorBytes: Dict[bytes, TokenType] = {
+    operator.encode(): type for operator, type in LoxOperator.items()
+}
 
 
 class Scanner:
-    def __init__(self, lox, source: str):
-        self.source: str = source
+    def __init__(self, lox, source: str | bytes | mmap, engine: str = "match"):
+        """The source is usually a str, UTF-8 bytes (bytes, mmap, memoryview) are
+        scanned in place with the regex engine and only decoded on demand"""
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown scanning engine {engine}")
+        if not isinstance(source, str):
+            engine = "regex"
+        self.source: str | bytes | mmap = source
         self.lox = lox
+        self.engine: str = engine
         self.tokens: List[Token] = []
         self.start: int = 0 # Offset of the beginning of the lexeme
         self.current: int = 0 # current char considered in the lexeme
         self.line: int = 1
+        # Identifiers of this scan, their tokens share one lexeme string
+        self.symbols: SymbolTable = SymbolTable()
 
     def scanTokens(self) -> List[Token]:
+        """Scan the whole source and return the list of tokens"""
+        tokens: List[Token] = list(self.iterTokens())
+        self.tokens = tokens
+        return tokens
+
+    def scanBuffer(self) -> TokenBuffer:
+        """Scan the whole source into a compact TokenBuffer"""
+        if not isinstance(self.source, str):
+            return self.scanBufferBytes()
+
+        buffer: TokenBuffer = TokenBuffer(self.source)
+        append = buffer.append
+        for token in self.iterTokens():
+            # start and current always delimit the lexeme of the yielded token
+            append(token.type, self.start, self.current, token.line, token.literal)
+        return buffer
+
+    def iterTokens(self) -> Iterator[Token]:
+        """Lazily yield the tokens as soon as they are scanned, ending with EOF"""
+        if not isinstance(self.source, str):
+            # Bytes are only scanned into a buffer, the tokens are views on it
+            yield from self.scanBuffer()
+            return
+        if self.engine == "regex":
+            yield from self.iterTokensRegex()
+            return
+
         while not self.isAtEnd():
             self.start = self.current
             self.scanToken()
-
-        self.tokens.append(Token(TokenType.EOF, "", None, self.line))
-        return self.tokens
+            # scanToken adds at most one token, hand it over right away
+            if self.tokens:
+                yield from self.tokens
+                self.tokens.clear()
+
+        self.start = self.current
+        yield Token(TokenType.EOF, "", None, self.line, self.current)
+
+    def iterTokensRegex(self) -> Iterator[Token]:
+        """Same token stream as the match engine but whole lexemes are pulled
+        at once with LEXEME_PATTERN instead of dispatching on every char"""
+        source: str = self.source
+        end: int = len(source)
+        matcher = LEXEME_PATTERN.match
+        lexemes = self.symbols.lexemes
+        addSymbol = self.symbols.add
+        line: int = self.line
+        pos: int = self.current
+
+        while pos < end:
+            found = matcher(source, pos)
+            kind: str = found.lastgroup
+            text: str = found.group()
+            self.start = start = pos
+            self.current = pos = found.end()
+            if kind == "WHITESPACE":
+                line += text.count("\n")
+            elif kind == "IDENTIFIER":
+                # One lookup for both the keywords and the interning
+                entry = lexemes.get(text)
+                if entry is None:
+                    entry = addSymbol(text)
+                yield Token(entry[0], entry[1], None, line, start)
+            elif kind == "NUMBER":
+                yield Token(TokenType.NUMBER, text, float(text), line, start)
+            elif kind == "OPERATOR":
+                yield Token(LoxOperator[text], text, None, line, start)
+            elif kind == "STRING":
+                line += text.count("\n")
+                if len(text) < 2 or text[-1] != '"':
+                    self.lox.error(line, "Unterminated string", pos)
+                else:
+                    yield Token(TokenType.STRING, text, text[1:-1], line, start)
+            elif kind == "BLOCK_COMMENT":
+                pos, line = self.skipBlockComment(pos, line)
+            elif kind == "UNEXPECTED":
+                self.lox.error(line, "Unexpected character", start)
+            # Line comments are simply dropped
+
+        self.start = self.current = pos
+        self.line = line
+        yield Token(TokenType.EOF, "", None, line, pos)
+
+    def scanBufferBytes(self) -> TokenBuffer:
+        """Regex engine working directly on UTF-8 bytes, nothing is decoded here:
+        lexemes and string literals are decoded by the buffer when read"""
+        source: bytes | mmap = self.source
+        buffer: TokenBuffer = TokenBuffer(source)
+        append = buffer.append
+        end: int = len(source)
+        matcher = LEXEME_PATTERN_BYTES.match
+        line: int = self.line
+        pos: int = self.current
+
+        while pos < end:
+            found = matcher(source, pos)
+            kind: str = found.lastgroup
+            start: int = pos
+            pos = found.end()
+            if kind == "WHITESPACE":
+                line += found.group().count(b"\n")
+            elif kind == "IDENTIFIER":
+                # Only a lexeme that may be a keyword is sliced to look it up
+                if (
+                    KEYWORD_MIN_LENGTH <= pos - start <= KEYWORD_MAX_LENGTH
+                    and source[start] in KEYWORD_STARTS
+                ):
+                    type = LoxKeywordBytes.get(found.group(), TokenType.IDENTIFIER)
+                else:
+                    type = TokenType.IDENTIFIER
+                append(type, start, pos, line)
+            elif kind == "NUMBER":
+                append(TokenType.NUMBER, start, pos, line, float(found.group()))
+            elif kind == "OPERATOR":
+                append(LoxOperatorBytes[found.group()], start, pos, line)
+            elif kind == "STRING":
+                text: bytes = found.group()
+                line += text.count(b"\n")
+                if len(text) < 2 or text[-1] != 34:  # '"'
+                    self.lox.error(line, "Unterminated string", pos)
+                else:
+                    append(TokenType.STRING, start, pos, line)
+            elif kind == "BLOCK_COMMENT":
+                pos, line = self.skipBlockComment(pos, line)
+            elif kind == "UNEXPECTED":
+                self.lox.error(line, "Unexpected character", start)
+
+        self.start = self.current = pos
+        self.line = line
+        append(TokenType.EOF, pos, pos, line)
+        return buffer
+
+    def skipBlockComment(self, pos: int, line: int) -> tuple[int, int]:
+        """Jump over a (nested) block comment whose opening was just consumed,
+        return the offset and line after it"""
+        source: str | bytes | mmap = self.source
+        if isinstance(source, str):
+            search = BLOCK_COMMENT_PATTERN.search
+        else:
+            search = BLOCK_COMMENT_PATTERN_BYTES.search
+        level: int = 1
+        while level != 0:
+            found = search(source, pos)
+            if found is None:
+                line += self.countNewlines(pos, len(source))
+                self.lox.error(line, "Unterminated block comment", len(source))
+                return len(source), line
+            line += self.countNewlines(pos, found.start())
+            pos = found.end()
+            level += 1 if found.lastindex == 1 else -1
+        return pos, line
+
+    def countNewlines(self, start: int, end: int) -> int:
+        """Number of newlines in the source between the two offsets"""
+        source: str | bytes | mmap = self.source
+        if isinstance(source, str):
+            return source.count("\n", start, end)
+        if isinstance(source, bytes):
+            return source.count(b"\n", start, end)
+        # mmap and memoryview have no count, work on a copy of the range
+        return bytes(source[start:end]).count(b"\n")
 
     def scanToken(self) -> None:
         char = self.advance()
@@ -83,7 +305,7 @@ class Scanner:
                     self.handleIdentifier()
                 else:
                     # TODO: Continue at 4.6.2
-                    self.lox.error(self.line, "Unexpected character")
+                    self.lox.error(self.line, "Unexpected character", self.start)
 
     def isDigit(self, current_char: str) -> bool:
         return current_char >= "0" and current_char <= "9"
@@ -146,9 +368,8 @@ class Scanner:
          #TODO Add support for pure integers (int64) with a different type ? and floating points
 
         # Finished the parsing of the number
-        self.addTokenObj(
-            TokenType.NUMBER, float(self.source[self.start : self.current])
-        )
+        text: str = self.source[self.start : self.current]
+        self.addTokenText(TokenType.NUMBER, text, float(text))
 
     def handleString(self) -> None:
         # Move the current pointer until end of string
@@ -158,7 +379,7 @@ class Scanner:
             self.advance()
 
         if self.isAtEnd():
-            self.lox.error(self.line, "Unterminated string")
+            self.lox.error(self.line, "Unterminated string", self.current)
             return
 
         self.advance()
@@ -171,14 +392,10 @@ class Scanner:
         while self.isAlphaNumeric(self.peek()):
             self.advance()
 
-        # Might be a given keyword or just identifier
-        text: str = self.source[self.start : self.current]
-        tokenType: TokenType = LoxKeyword.get(text)
-        if tokenType is None:
-            # If no given keyword is find we define it as an identifier
-            tokenType = TokenType.IDENTIFIER
-
-        self.addToken(tokenType)
+        # Might be a given keyword or just identifier, the symbol table knows
+        # both and gives the lexeme shared by all the tokens of the identifier
+        tokenType, text = self.symbols.lookup(self.source[self.start : self.current])
+        self.addTokenText(tokenType, text, None)
 
     def handleBlockComments(self) -> None:
         level = 1
@@ -202,12 +419,15 @@ class Scanner:
 
         # TODO: Check if we finished to handle the comments
         if self.isAtEnd() and level > 0:
-            self.lox.error(self.line, "Unterminated block comment")
+            self.lox.error(self.line, "Unterminated block comment", self.current)
             return
 
     def addToken(self, type: TokenType) -> None:
         self.addTokenObj(type, None)
 
     def addTokenObj(self, type: TokenType, obj: object) -> None:
-        text = self.source[self.start : self.current]
-        self.tokens.append(Token(type, text, obj, self.line))
+        self.addTokenText(type, self.source[self.start : self.current], obj)
+
+    def addTokenText(self, type: TokenType, text: str, obj: object) -> None:
+        """Add a token whose lexeme was already sliced"""
+        self.tokens.append(Token(type, text, obj, self.line, self.start))
@@ -0,0 +1,245 @@
+import struct
+import sys
+from array import array
+from typing import Dict, Hashable, List, Tuple
+
+from expr import Binary, Expr, Grouping, Literal, Unary
+from loxtoken import Token
+from nodefactory import NodeFactory
+from tokenbuffer import TokenCodes, TokenTypes
+
+# Binary format of the Expr trees:
+#
+#   magic, version
+#   constants: count, then a tag and a payload for each value
+#   tokens: count, then (type code, lexeme index, literal index, line, offset)
+#   each
+#   nodes: count, one opcode byte per node in preorder, the width of the
+#   arguments and one argument per node (constant index of a literal, token
+#   index of an operator, unused for a group)
+#
+# Lexemes and literals share the constant table and identical constants and
+# tokens are stored once. Integers are little endian. The token types are
+# stored with their TokenCodes, so the version is bumped when TokenType changes.
+MAGIC: bytes = b"LOXE"
+FORMAT_VERSION: int = 2
+
+# Opcodes of the nodes
+BINARY: int = 0
+GROUPING: int = 1
+LITERAL: int = 2
+UNARY: int = 3
+
+# Tags of the constants
+NIL: int = 0
+FALSE: int = 1
+TRUE: int = 2
+NUMBER: int = 3
+STRING: int = 4
+INTEGER: int = 5
+
+HEADER = struct.Struct("<4sB")
+COUNT = struct.Struct("<I")
+FLOAT = struct.Struct("<d")
+TOKEN = struct.Struct("<BIIIq")
+
+# Array type codes of the argument widths
+ARGUMENT_CODES: Dict[int, str] = {1: "B", 2: "H", 4: "I"}
+
+
+class Tables:
+    """Deduplicated constants and tokens referenced by the node stream"""
+
+    def __init__(self):
+        self.constants: List[object] = []
+        self.constantIndex: Dict[Hashable, int] = {}
+        self.tokens: List[Tuple[int, int, int, int, int]] = []
+        self.tokenIndex: Dict[Tuple[int, int, int, int, int], int] = {}
+
+    def constant(self, value: object) -> int:
+        # Keyed on the type (True == 1.0) and on the bits of the floats
+        # (-0.0 == 0.0 and nan != nan)
+        if isinstance(value, float):
+            key: Hashable = (float, FLOAT.pack(value))
+        else:
+            key = (type(value), value)
+        index: int | None = self.constantIndex.get(key)
+        if index is None:
+            index = self.constantIndex[key] = len(self.constants)
+            self.constants.append(value)
+        return index
+
+    def token(self, token: Token) -> int:
+        entry: Tuple[int, int, int, int, int] = (
+            TokenCodes[token.type],
+            self.constant(token.lexeme),
+            self.constant(token.literal),
+            token.line,
+            token.offset,
+        )
+        index: int | None = self.tokenIndex.get(entry)
+        if index is None:
+            index = self.tokenIndex[entry] = len(self.tokens)
+            self.tokens.append(entry)
+        return index
+
+
+def dump(expr: Expr) -> bytes:
+    """Encode a tree, shared subtrees are written once per occurrence"""
+    tables: Tables = Tables()
+    opcodes: bytearray = bytearray()
+    arguments: List[int] = []
+    # Explicit stack instead of recursion so deep trees can be dumped
+    stack: List[Expr] = [expr]
+    while stack:
+        node: Expr = stack.pop()
+        match node:
+            case Binary():
+                opcodes.append(BINARY)
+                arguments.append(tables.token(node.operator))
+                stack.append(node.right)
+                stack.append(node.left)
+            case Grouping():
+                opcodes.append(GROUPING)
+                arguments.append(0)
+                stack.append(node.expression)
+            case Literal():
+                opcodes.append(LITERAL)
+                arguments.append(tables.constant(node.value))
+            case Unary():
+                opcodes.append(UNARY)
+                arguments.append(tables.token(node.operator))
+                stack.append(node.right)
+            case _:
+                raise TypeError(f"Can't serialize {type(node).__name__}")
+
+    chunks: List[bytes] = [HEADER.pack(MAGIC, FORMAT_VERSION)]
+    chunks.append(COUNT.pack(len(tables.constants)))
+    for value in tables.constants:
+        chunks.append(dumpConstant(value))
+    chunks.append(COUNT.pack(len(tables.tokens)))
+    for entry in tables.tokens:
+        chunks.append(TOKEN.pack(*entry))
+
+    largest: int = max(arguments)
+    width: int = 1 if largest < 1 << 8 else 2 if largest < 1 << 16 else 4
+    packed: array = array(ARGUMENT_CODES[width], arguments)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    chunks.append(COUNT.pack(len(opcodes)))
+    chunks.append(bytes(opcodes))
+    chunks.append(bytes((width,)))
+    chunks.append(packed.tobytes())
+    return b"".join(chunks)
+
+
+def dumpConstant(value: object) -> bytes:
+    if value is None:
+        return bytes((NIL,))
+    if value is False:
+        return bytes((FALSE,))
+    if value is True:
+        return bytes((TRUE,))
+    if isinstance(value, float):
+        return bytes((NUMBER,)) + FLOAT.pack(value)
+    if isinstance(value, int):
+        # Results of the folding may be integers, kept exact whatever their size
+        digits: bytes = str(value).encode()
+        return bytes((INTEGER,)) + COUNT.pack(len(digits)) + digits
+    if isinstance(value, str):
+        text: bytes = value.encode("utf-8", "surrogatepass")
+        return bytes((STRING,)) + COUNT.pack(len(text)) + text
+    raise TypeError(f"Can't serialize the constant {value!r}")
+
+
+def load(data: bytes, factory: NodeFactory | None = None) -> Expr:
+    """Decode a tree written by dump, the nodes are built by the factory.
+    Raises ValueError on malformed data."""
+    factory = factory if factory is not None else NodeFactory()
+    view: memoryview = memoryview(data)
+    try:
+        magic, version = HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a serialized Lox expression")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported serialization version {version}")
+        offset: int = HEADER.size
+
+        constants: List[object] = []
+        (count,) = COUNT.unpack_from(view, offset)
+        offset += COUNT.size
+        for _ in range(count):
+            value, offset = loadConstant(view, offset)
+            constants.append(value)
+
+        tokens: List[Token] = []
+        (count,) = COUNT.unpack_from(view, offset)
+        offset += COUNT.size
+        for code, lexeme, literal, line, start in TOKEN.iter_unpack(
+            view[offset : offset + count * TOKEN.size]
+        ):
+            tokens.append(
+                Token(
+                    TokenTypes[code], constants[lexeme], constants[literal], line, start
+                )
+            )
+        offset += count * TOKEN.size
+
+        (count,) = COUNT.unpack_from(view, offset)
+        offset += COUNT.size
+        opcodes: bytes = bytes(view[offset : offset + count])
+        width: int = view[offset + count]
+        offset += count + 1
+        arguments: array = array(ARGUMENT_CODES[width])
+        arguments.frombytes(view[offset : offset + count * width])
+        if sys.byteorder == "big":
+            arguments.byteswap()
+        if len(opcodes) != count or len(arguments) != count:
+            raise ValueError("Truncated serialized expression")
+
+        # In reversed preorder the children of a node are built before it,
+        # the left one on the top of the stack
+        stack: List[Expr] = []
+        binary, grouping = factory.binary, factory.grouping
+        literal, unary = factory.literal, factory.unary
+        for index in range(count - 1, -1, -1):
+            opcode: int = opcodes[index]
+            if opcode == LITERAL:
+                stack.append(literal(constants[arguments[index]]))
+            elif opcode == BINARY:
+                left: Expr = stack.pop()
+                stack.append(binary(left, tokens[arguments[index]], stack.pop()))
+            elif opcode == UNARY:
+                stack.append(unary(tokens[arguments[index]], stack.pop()))
+            elif opcode == GROUPING:
+                stack.append(grouping(stack.pop()))
+            else:
+                raise ValueError(f"Unknown opcode {opcode}")
+    except (struct.error, IndexError, KeyError, UnicodeDecodeError) as e:
+        raise ValueError("Malformed serialized expression") from e
+    if len(stack) != 1:
+        raise ValueError("Malformed serialized expression")
+    return stack[0]
+
+
+def loadConstant(view: memoryview, offset: int) -> Tuple[object, int]:
+    tag: int = view[offset]
+    offset += 1
+    if tag == NIL:
+        return None, offset
+    if tag == FALSE:
+        return False, offset
+    if tag == TRUE:
+        return True, offset
+    if tag == NUMBER:
+        return FLOAT.unpack_from(view, offset)[0], offset + FLOAT.size
+    if tag in (STRING, INTEGER):
+        (length,) = COUNT.unpack_from(view, offset)
+        offset += COUNT.size
+        text: bytes = bytes(view[offset : offset + length])
+        if len(text) != length:
+            raise ValueError("Truncated serialized expression")
+        if tag == INTEGER:
+            return int(text), offset + length
+        return text.decode("utf-8", "surrogatepass"), offset + length
+    raise ValueError(f"Unknown constant tag {tag}")
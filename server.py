@@ -0,0 +1,174 @@
+import asyncio
+import base64
+import json
+import os
+import signal
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List
+
+import serializer
+from cache import CacheEntry, Diagnostic
+from lineindex import LineIndex
+from parsecache import ParseCache
+from plox import PRINTERS, Lox
+
+# Operations of the requests
+OPERATIONS: List[str] = ["tokenize", "parse", "print"]
+DEFAULT_TIMEOUT: float = 10.0
+# Longest request line, the source included
+DEFAULT_MAX_BYTES: int = 1 << 20
+
+# Warm interpreter of a worker process, only used for its analyze methods.
+# Clients tend to send the same sources again, each worker keeps them in memory
+worker: Lox = Lox(engine="regex", parseCache=ParseCache())
+
+
+def diagnostics(source: str, entry: CacheEntry) -> List[Dict[str, Any]]:
+    errors: List[Diagnostic] = list(entry.scanErrors)
+    if entry.parseError is not None:
+        errors.append(entry.parseError)
+    found: List[Dict[str, Any]] = []
+    index: LineIndex | None = None
+    for line, where, msg, offset in errors:
+        column: int | None = None
+        if offset >= 0:
+            index = index or LineIndex(source)
+            line, column = index.position(offset)
+        found.append({"line": line, "column": column, "where": where, "message": msg})
+    return found
+
+
+def handle(request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Answer a request in a worker process. A request is a JSON object with:
+
+        op: one of OPERATIONS
+        source: the Lox source
+        printer: "ast" or "rpn", for print only
+
+    The answer has ok, the Lox errors and the result: the tokens as
+    [type, lexeme, literal, line] for tokenize, the tree written by
+    serializer.dump in base64 for parse and the printed tree for print.
+    """
+    operation: Any = request.get("op")
+    source: Any = request.get("source")
+    if operation not in OPERATIONS:
+        return {"ok": False, "error": f"Unknown operation {operation!r}"}
+    if not isinstance(source, str):
+        return {"ok": False, "error": "The source must be a string"}
+    printer: Any = request.get("printer", "ast")
+    if operation == "print" and printer not in PRINTERS:
+        return {"ok": False, "error": f"Unknown printer {printer!r}"}
+
+    # Tokenizing only scans, the sources too deep to parse still have tokens
+    entry: CacheEntry = worker.analyzeCached(source, parse=operation != "tokenize")
+    result: Any = None
+    if operation == "tokenize":
+        result = [
+            [token.type.name, token.lexeme, token.literal, token.line]
+            for token in entry.buffer
+        ]
+    elif entry.expr is not None and not entry.scanErrors:
+        if operation == "parse":
+            result = base64.b64encode(serializer.dump(entry.expr)).decode("ascii")
+        else:
+            result = PRINTERS[printer]().print(entry.expr)
+    return {"ok": True, "errors": diagnostics(source, entry), "result": result}
+
+
+class PloxServer:
+    """
+    Answer newline delimited JSON requests (see handle) on a Unix domain
+    socket. The requests of a connection are answered in order, the ones of
+    different connections concurrently by a pool of warm worker processes.
+    An answer carries the id of its request if it had one.
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        timeout: float = DEFAULT_TIMEOUT,
+        maxBytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.executor: Executor = executor
+        self.timeout: float = timeout
+        self.maxBytes: int = maxBytes
+
+    async def serve(self, path: str) -> None:
+        server: asyncio.AbstractServer = await asyncio.start_unix_server(
+            self.connected, path, limit=self.maxBytes
+        )
+        # Stop cleanly on a signal so the socket file is removed
+        serving: asyncio.Task | None = asyncio.current_task()
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, serving.cancel)
+        try:
+            async with server:
+                await server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    async def connected(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                try:
+                    line: bytes = await reader.readline()
+                except ValueError:
+                    # The rest of the line can't be told apart from the next
+                    # requests, the connection is closed
+                    await self.send(writer, {"ok": False, "error": "Request too large"})
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    await self.send(writer, await self.answer(line))
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def answer(self, line: bytes) -> Dict[str, Any]:
+        try:
+            request: Any = json.loads(line)
+        except ValueError as e:
+            return {"ok": False, "error": f"Invalid JSON: {e}"}
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "A request must be a JSON object"}
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        try:
+            response: Dict[str, Any] = await asyncio.wait_for(
+                loop.run_in_executor(self.executor, handle, request), self.timeout
+            )
+        except asyncio.TimeoutError:
+            # The worker still finishes the request, only the answer is dropped
+            response = {"ok": False, "error": f"Timed out after {self.timeout}s"}
+        except Exception as e:
+            # Sources nested too deeply for the parser included
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        if "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    async def send(self, writer: asyncio.StreamWriter, response: Dict[str, Any]) -> None:
+        writer.write(json.dumps(response).encode() + b"\n")
+        await writer.drain()
+
+
+def serve(
+    path: str,
+    jobs: int,
+    timeout: float = DEFAULT_TIMEOUT,
+    maxBytes: int = DEFAULT_MAX_BYTES,
+) -> None:
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        # Start the workers now so the first requests don't pay for it
+        for future in [executor.submit(os.getpid) for _ in range(jobs)]:
+            future.result()
+        asyncio.run(PloxServer(executor, timeout, maxBytes).serve(path))
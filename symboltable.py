@@ -0,0 +1,48 @@
+from typing import Dict, List, Tuple
+
+from loxtoken import LoxKeyword, TokenType
+
+# Shortest and longest keywords and their first bytes, a lexeme outside of
+# them is an identifier without slicing it to look it up
+KEYWORD_MIN_LENGTH: int = min(map(len, LoxKeyword))
+KEYWORD_MAX_LENGTH: int = max(map(len, LoxKeyword))
+KEYWORD_STARTS: frozenset = frozenset(ord(keyword[0]) for keyword in LoxKeyword)
+
+
+class SymbolTable:
+    """
+    Identifiers met by a scan. Each distinct lexeme is kept once, the tokens
+    share it, and gets a small id in order of first occurrence. The keywords
+    are in the same table so one lookup, which hashes the lexeme once, tells
+    a keyword from an identifier and gives the shared lexeme.
+    """
+
+    __slots__ = ("names", "ids", "lexemes")
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+        # Lexeme to its TokenType and shared string, keywords included
+        self.lexemes: Dict[str, Tuple[TokenType, str]] = {
+            keyword: (type, keyword) for keyword, type in LoxKeyword.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def lookup(self, lexeme: str) -> Tuple[TokenType, str]:
+        """TokenType and shared string of an identifier or keyword lexeme"""
+        entry: Tuple[TokenType, str] | None = self.lexemes.get(lexeme)
+        if entry is None:
+            entry = self.add(lexeme)
+        return entry
+
+    def add(self, name: str) -> Tuple[TokenType, str]:
+        self.ids[name] = len(self.names)
+        self.names.append(name)
+        entry: Tuple[TokenType, str] = (TokenType.IDENTIFIER, name)
+        self.lexemes[name] = entry
+        return entry
+
+    def idOf(self, name: str) -> int:
+        return self.ids[name]
@@ -0,0 +1,151 @@
+from array import array
+from mmap import mmap
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Mapping
+
+from loxtoken import BaseToken, Token, TokenType
+
+# Stable small integer code for each TokenType, used to store types in a byte
+TokenTypes: List[TokenType] = list(TokenType)
+TokenCodes: Dict[TokenType, int] = {type: code for code, type in enumerate(TokenTypes)}
+STRING_CODE: int = TokenCodes[TokenType.STRING]
+
+
+class TokenBuffer:
+    """
+    Token stream stored as parallel typed arrays (struct of arrays) instead of
+    one Token object per token. Lexemes are not copied, only their offsets in
+    the source are kept.
+    """
+
+    __slots__ = ("source", "encoded", "types", "starts", "ends", "lines", "literals")
+
+    def __init__(self, source: str | bytes | mmap):
+        # The source may also be UTF-8 bytes (bytes, mmap, memoryview), the
+        # lexemes and string literals are then decoded when read
+        self.source: str | bytes | mmap = source
+        self.encoded: bool = not isinstance(source, str)
+        self.types: array = array("B")  # TokenCodes of the tokens
+        self.starts: array = array("q")  # Offset of the first char of the lexeme
+        self.ends: array = array("q")  # Offset after the last char of the lexeme
+        self.lines: array = array("I")
+        # Side table for the few tokens that carry a literal
+        self.literals: Dict[int, object] = {}
+
+    def append(
+        self, type: TokenType, start: int, end: int, line: int, literal: object = None
+    ) -> None:
+        if literal is not None:
+            self.literals[len(self.types)] = literal
+        self.types.append(TokenCodes[type])
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, index: int) -> "TokenView":
+        if index < 0:
+            index += len(self.types)
+        if not 0 <= index < len(self.types):
+            raise IndexError("TokenBuffer index out of range")
+        return TokenView(self, index)
+
+    def __iter__(self) -> Iterator["TokenView"]:
+        for index in range(len(self.types)):
+            yield TokenView(self, index)
+
+    def typeAt(self, index: int) -> TokenType:
+        return TokenTypes[self.types[index]]
+
+    def lexemeAt(self, index: int) -> str:
+        lexeme = self.source[self.starts[index] : self.ends[index]]
+        if self.encoded:
+            return bytes(lexeme).decode("utf-8")
+        return lexeme
+
+    def literalAt(self, index: int) -> object:
+        if self.encoded and self.types[index] == STRING_CODE:
+            # String literals of bytes sources are not stored but decoded here
+            return self.lexemeAt(index)[1:-1]
+        return self.literals.get(index)
+
+    def toTokens(self) -> List[Token]:
+        """Materialize the buffer as plain Token objects"""
+        return [
+            Token(view.type, view.lexeme, view.literal, view.line, view.offset)
+            for view in self
+        ]
+
+
+class FrozenTokenBuffer(TokenBuffer):
+    """
+    Read only copy of a TokenBuffer, for the buffers shared between callers
+    like the ones of a ParseCache. The columns are read only memoryviews over
+    copies of the arrays and the literals a read only mapping.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, buffer: TokenBuffer):
+        assign = object.__setattr__
+        assign(self, "source", buffer.source)
+        assign(self, "encoded", buffer.encoded)
+        for name in ("types", "starts", "ends", "lines"):
+            column: array = getattr(buffer, name)
+            assign(self, name, memoryview(column.tobytes()).cast(column.typecode))
+        literals: Mapping[int, object] = MappingProxyType(dict(buffer.literals))
+        assign(self, "literals", literals)
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError(f"{type(self).__name__} is shared and immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is shared and immutable")
+
+    def append(
+        self, type: TokenType, start: int, end: int, line: int, literal: object = None
+    ) -> None:
+        raise AttributeError(f"{type(self).__name__} is shared and immutable")
+
+
+def freeze(buffer: TokenBuffer) -> FrozenTokenBuffer:
+    """Read only version of a buffer, itself when it already is"""
+    if isinstance(buffer, FrozenTokenBuffer):
+        return buffer
+    return FrozenTokenBuffer(buffer)
+
+
+class TokenView(BaseToken):
+    """
+    Token backed by a TokenBuffer entry, the lexeme is only sliced from the
+    source when asked for. It only holds its buffer and index, not the slots
+    of a Token.
+    """
+
+    __slots__ = ("buffer", "index")
+
+    def __init__(self, buffer: TokenBuffer, index: int):
+        self.buffer: TokenBuffer = buffer
+        self.index: int = index
+
+    @property
+    def type(self) -> TokenType:
+        return TokenTypes[self.buffer.types[self.index]]
+
+    @property
+    def lexeme(self) -> str:
+        return self.buffer.lexemeAt(self.index)
+
+    @property
+    def literal(self) -> object:
+        return self.buffer.literalAt(self.index)
+
+    @property
+    def line(self) -> int:
+        return self.buffer.lines[self.index]
+
+    @property
+    def offset(self) -> int:
+        return self.buffer.starts[self.index]
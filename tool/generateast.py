@@ -1,4 +1,5 @@
 from io import TextIOWrapper
+from string import Template
 from typing import List
 from pathlib import Path
 import argparse
@@ -6,10 +7,74 @@ import argparse
 
 FOUR_SPACES: str = 4 * " "
 
+# Dispatch of the Visitor through the kind tables, $base is the base class
+VISIT_DISPATCH: Template = Template(
+    '''    # Visit function of each node class met, one dict per visitor class
+    handlers: Dict[type, Callable[[Visitor, $base], Any]] = {}
 
-def defineVisitInterface(file: TextIOWrapper, baseName: str, types: List[str]):
+    def __init_subclass__(cls, **kwargs: Any):
+        super().__init_subclass__(**kwargs)
+        cls.handlers = {}
+
+    def visit(self, $lower: $base) -> Any:
+        """Same as $lower.accept(self) with a single lookup of the visit method"""
+        handler: Callable[[Visitor, $base], Any] | None = self.handlers.get(type($lower))
+        if handler is None:
+            handler = type(self).handlerOf(type($lower))
+        return handler(self, $lower)
+
+    @classmethod
+    def handlerOf(cls, nodeType: type) -> Callable[[Visitor, $base], Any]:
+        """Visit function of a node class, the classes unknown to the tables
+        or overriding accept go through accept"""
+        kind: int | None = getattr(nodeType, "kind", None)
+        if kind is not None and nodeType.accept is CLASSES[kind].accept:
+            handler: Callable[[Visitor, $base], Any] = getattr(cls, VISIT_METHODS[kind])
+        else:
+            handler = acceptVisitor
+        cls.handlers[nodeType] = handler
+        return handler
+
+    def walk(self, $lower: $base) -> None:
+        """Visit every node of the tree in preorder without recursion, the
+        visit methods mustn't visit the children themselves"""
+        visit: Callable[[$base], Any] = self.visit
+        for node in preorder($lower):
+            visit(node)
+'''
+)
+
+# Functions using the kind tables, $base is the base class
+KIND_FUNCTIONS: Template = Template(
+    '''
+
+def acceptVisitor(visitor: Visitor, $lower: $base) -> Any:
+    return $lower.accept(visitor)
+
+
+def preorder($lower: $base) -> Iterator[$base]:
+    """Nodes of a tree in preorder, with an explicit stack so deep trees are
+    fine. The nodes without a kind are leaves."""
+    stack: List[$base] = [$lower]
+    push = stack.append
+    pop = stack.pop
+    while stack:
+        node: $base = pop()
+        yield node
+        kind: int | None = getattr(node, "kind", None)
+        if kind is not None:
+            for name in CHILDREN[kind]:
+                push(getattr(node, name))'''
+)
+
+
+def defineVisitInterface(
+    file: TextIOWrapper, baseName: str, types: List[str], kinds: bool = False
+):
     """Implement visitor functions inside the Visitor class"""
     print(f"class Visitor:\n", file=file)
+    if kinds:
+        print(VISIT_DISPATCH.substitute(base=baseName, lower=baseName.lower()), file=file)
     for type in types:
         className: str = type.split(":")[0].strip()
         print(
@@ -22,10 +87,60 @@ def defineVisitInterface(file: TextIOWrapper, baseName: str, types: List[str]):
         )
 
 
-def defineType(file: TextIOWrapper, baseName: str, className: str, classFields: str):
+def defineKinds(file: TextIOWrapper, baseName: str, types: List[str]):
+    """Integer kind tag of each class, in the order of the types so new
+    classes must be appended to keep the tags stable"""
+    print("# Kind tag of each node class", file=file)
+    for kind, type in enumerate(types):
+        className: str = type.split(":")[0].strip()
+        print(f"{className.upper()}: int = {kind}", file=file)
+    print("", file=file)
+
+
+def defineDispatch(file: TextIOWrapper, baseName: str, types: List[str]):
+    """Tables to dispatch on the class or the kind of a node without accept"""
+    classNames: List[str] = [type.split(":")[0].strip() for type in types]
+    kinds: str = ", ".join(f"{name}: {name.upper()}" for name in classNames)
+    methods: str = ", ".join(f'"visit{name}{baseName}"' for name in classNames)
+    print("\n# Kind of each node class, subclasses have the kind of their base", file=file)
+    print(f"KINDS: Dict[type, int] = {{{kinds}}}", file=file)
+    print("# Class of each kind", file=file)
+    print(f"CLASSES: Tuple[type, ...] = ({', '.join(classNames)})", file=file)
+    print("# Visitor method of each kind", file=file)
+    print(f"VISIT_METHODS: Tuple[str, ...] = ({methods})", file=file)
+    # Fields holding nodes, last one first so they are popped in order
+    children: List[str] = []
+    for type in types:
+        fields: List[str] = [field.strip().split(" ") for field in type.split(":")[1].split(",")]
+        names: List[str] = [name for fieldType, name in fields if fieldType == baseName]
+        quoted: List[str] = [f'"{name}"' for name in reversed(names)]
+        children.append(f"({', '.join(quoted)}{',' if len(quoted) == 1 else ''})")
+    print("# Child fields of each kind, from the last one", file=file)
+    print(f"CHILDREN: Tuple[Tuple[str, ...], ...] = ({', '.join(children)})", file=file)
+    print(KIND_FUNCTIONS.substitute(base=baseName, lower=baseName.lower()), file=file)
+
+
+def defineType(
+    file: TextIOWrapper,
+    baseName: str,
+    className: str,
+    classFields: str,
+    slots: bool = False,
+    compact: bool = False,
+    kinds: bool = False,
+):
     # Class declaration
     print(f"class {className}({baseName}):", file=file)
     # Fields declaration
+    if slots:
+        names: List[str] = [field.strip().split(" ")[1] for field in classFields.split(",")]
+        slotsList: str = ",".join(f'"{name}"' for name in names)
+        if len(names) == 1:
+            slotsList += ","
+        print(f"{FOUR_SPACES}__slots__ = ({slotsList})", file=file)
+    if kinds:
+        # A class attribute, the nodes don't pay for it
+        print(f"{FOUR_SPACES}kind = {className.upper()}", file=file)
 
     # Fields declaration in the constructor
     fieldsList: str = ""
@@ -35,37 +150,60 @@ def defineType(file: TextIOWrapper, baseName: str, className: str, classFields:
         fielddecl = name + ":" + fieldtype
         fieldsList += fielddecl + ","
     fieldsList = fieldsList[:-1]  # remove the last comma
-    print(f"\n{FOUR_SPACES}def __init__(self,{fieldsList}):", file=file)
-    # Write the content of the init part
-    for field in fields:
-        _, name = field.strip().split(" ")
-        print(f"{2*FOUR_SPACES}self.{name} = {name}", file=file)
+    names: List[str] = [field.strip().split(" ")[1] for field in fields]
+    if compact:
+        # A single assignment of all the fields
+        print(f"\n{FOUR_SPACES}def __init__(self,{fieldsList}):", file=file)
+        targets: str = ",".join(f"self.{name}" for name in names)
+        print(f"{2*FOUR_SPACES}{targets} = {','.join(names)}", file=file)
+    else:
+        print(f"\n{FOUR_SPACES}def __init__(self,{fieldsList}):", file=file)
+        # Write the content of the init part
+        for name in names:
+            print(f"{2*FOUR_SPACES}self.{name} = {name}", file=file)
     print(f"\n{FOUR_SPACES}def accept(self,visitor:Visitor):", file=file)
     print(f"{2*FOUR_SPACES}return visitor.visit{className}{baseName}(self)", file=file)
     print("", file=file)
 
 
-def defineAst(outputDir: str, baseName: str, types: List[str]):
-    """Helper function to generator an AST file"""
+def defineAst(
+    outputDir: str,
+    baseName: str,
+    types: List[str],
+    slots: bool = False,
+    compact: bool = False,
+    kinds: bool = False,
+):
+    """Helper function to generator an AST file
+    With slots the nodes have no __dict__ and use less memory, with compact
+    the constructors assign all the fields in one statement and with kinds
+    each class has an integer kind tag and tables to dispatch on it are added"""
     pathstr = str(Path(outputDir).joinpath(baseName.lower()).with_suffix(".py"))
 
     with open(pathstr, "w", encoding="utf-8") as f:
 
+        typing: str = "Any, Callable, Dict, Iterator, List, Tuple" if kinds else "Any"
         print(
-            "from __future__ import annotations\nfrom loxtoken import Token\nfrom typing import Any\n",
+            f"from __future__ import annotations\nfrom loxtoken import Token\nfrom typing import {typing}\n",
             file=f,
         )
+        if kinds:
+            defineKinds(f, baseName, types)
         print(f"class {baseName}:", file=f)
+        if slots:
+            print(f"{FOUR_SPACES}__slots__ = ()", file=f)
         print(f"\n{FOUR_SPACES}def accept(self,visitor:Visitor) -> Any:", file=f)
         print(
             f'{2*FOUR_SPACES}raise NotImplementedError("Should be implemented")\n',
             file=f,
         )
-        defineVisitInterface(f, baseName, types)
+        defineVisitInterface(f, baseName, types, kinds)
         for type in types:
             className: str = type.split(":")[0].strip()
             classFields: str = type.split(":")[1].strip()
-            defineType(f, baseName, className, classFields)
+            defineType(f, baseName, className, classFields, slots, compact, kinds)
+        if kinds:
+            defineDispatch(f, baseName, types)
 
 
 if __name__ == "__main__":
@@ -73,6 +211,15 @@ if __name__ == "__main__":
         description="Lox AST generator", exit_on_error=False
     )
     parser.add_argument("outputDir", type=str, help="Output directory for AST file")
+    parser.add_argument(
+        "--slots", action="store_true", help="Generate nodes with __slots__"
+    )
+    parser.add_argument(
+        "--compact", action="store_true", help="Constructors assigning the fields at once"
+    )
+    parser.add_argument(
+        "--kinds", action="store_true", help="Kind tags and dispatch tables"
+    )
     try:
         args = parser.parse_args()
     except argparse.ArgumentError as e:
@@ -91,4 +238,7 @@ if __name__ == "__main__":
             "Literal  : object value",
             "Unary    : Token operator, Expr right",
         ],
+        args.slots,
+        args.compact,
+        args.kinds,
     )
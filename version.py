@@ -0,0 +1,2 @@
+# Version of plox, part of the key of the cached scripts
+PLOX_VERSION: str = "0.6.0"
@@ -0,0 +1,229 @@
+import struct
+from enum import IntEnum
+from typing import Any, Dict, Hashable, List
+
+from expr import Binary, Expr, Grouping, Literal, Unary, Visitor
+from interpreter import (
+    NUMBER_TYPES,
+    LoxRuntimeError,
+    divide,
+    isEqual,
+    isTruthy,
+    stringify,
+)
+from loxtoken import Token, TokenType
+
+
+class OpCode(IntEnum):
+    """Instructions of the stack VM, CONSTANT is followed by its index in the
+    constant pool, the others have no operand"""
+
+    CONSTANT = 0
+    NIL = 1
+    TRUE = 2
+    FALSE = 3
+    NEGATE = 4
+    NOT = 5
+    ADD = 6
+    SUBTRACT = 7
+    MULTIPLY = 8
+    DIVIDE = 9
+    GREATER = 10
+    GREATER_EQUAL = 11
+    LESS = 12
+    LESS_EQUAL = 13
+    EQUAL = 14
+    NOT_EQUAL = 15
+    RETURN = 16
+
+
+BinaryOpCodes: Dict[TokenType, OpCode] = {
+    TokenType.PLUS: OpCode.ADD,
+    TokenType.MINUS: OpCode.SUBTRACT,
+    TokenType.STAR: OpCode.MULTIPLY,
+    TokenType.SLASH: OpCode.DIVIDE,
+    TokenType.GREATER: OpCode.GREATER,
+    TokenType.GREATER_EQUAL: OpCode.GREATER_EQUAL,
+    TokenType.LESS: OpCode.LESS,
+    TokenType.LESS_EQUAL: OpCode.LESS_EQUAL,
+    TokenType.EQUAL_EQUAL: OpCode.EQUAL,
+    TokenType.BANG_EQUAL: OpCode.NOT_EQUAL,
+}
+
+# Bits of the float constants, their key in the constant pool
+FLOAT = struct.Struct("<d")
+
+UnaryOpCodes: Dict[TokenType, OpCode] = {
+    TokenType.MINUS: OpCode.NEGATE,
+    TokenType.BANG: OpCode.NOT,
+}
+
+
+class Chunk:
+    """Flat bytecode of a compiled expression with its constant pool"""
+
+    __slots__ = ("code", "constants", "operators")
+
+    def __init__(self):
+        self.code: List[int] = []
+        self.constants: List[object] = []
+        # Operator token of the instructions that can fail, for error reports
+        self.operators: Dict[int, Token] = {}
+
+    def disassemble(self) -> str:
+        lines: List[str] = []
+        offset: int = 0
+        while offset < len(self.code):
+            op: OpCode = OpCode(self.code[offset])
+            if op == OpCode.CONSTANT:
+                index: int = self.code[offset + 1]
+                value: str = stringify(self.constants[index])
+                lines.append(f"{offset:04} {op.name:<16} {index} '{value}'")
+                offset += 2
+            else:
+                lines.append(f"{offset:04} {op.name}")
+                offset += 1
+        return "\n".join(lines)
+
+
+class Compiler(Visitor):
+    """Lower an expression to bytecode, instructions are emitted in postfix
+    order like the RpnPrinter output"""
+
+    def compile(self, expr: Expr) -> Chunk:
+        self.chunk: Chunk = Chunk()
+        # Constant pool index of each value, keyed with the type so that 1 and
+        # true don't share an entry and on the bits of the floats so that -0.0
+        # and 0.0 don't either
+        self.constantIndex: Dict[Hashable, int] = {}
+        expr.accept(self)
+        self.emit(OpCode.RETURN)
+        return self.chunk
+
+    def emit(self, *code: int) -> None:
+        self.chunk.code.extend(code)
+
+    def emitOperator(self, op: OpCode, operator: Token) -> None:
+        self.chunk.operators[len(self.chunk.code)] = operator
+        self.emit(op)
+
+    def makeConstant(self, value: object) -> int:
+        if isinstance(value, float):
+            key: Hashable = (float, FLOAT.pack(value))
+        else:
+            key = (type(value), value)
+        index: int | None = self.constantIndex.get(key)
+        if index is None:
+            index = len(self.chunk.constants)
+            self.chunk.constants.append(value)
+            self.constantIndex[key] = index
+        return index
+
+    # Implement the Visitor interface
+    def visitBinaryExpr(self, expr: Binary) -> None:
+        expr.left.accept(self)
+        expr.right.accept(self)
+        self.emitOperator(BinaryOpCodes[expr.operator.type], expr.operator)
+
+    def visitGroupingExpr(self, expr: Grouping) -> None:
+        # Grouping only matters for the shape of the tree, nothing to emit
+        expr.expression.accept(self)
+
+    def visitLiteralExpr(self, expr: Literal) -> None:
+        value: object = expr.value
+        if value is None:
+            self.emit(OpCode.NIL)
+        elif value is True:
+            self.emit(OpCode.TRUE)
+        elif value is False:
+            self.emit(OpCode.FALSE)
+        else:
+            self.emit(OpCode.CONSTANT, self.makeConstant(value))
+
+    def visitUnaryExpr(self, expr: Unary) -> None:
+        expr.right.accept(self)
+        self.emitOperator(UnaryOpCodes[expr.operator.type], expr.operator)
+
+
+class VM:
+    """Stack based virtual machine running the compiled Chunk"""
+
+    def run(self, chunk: Chunk) -> Any:
+        code: List[int] = chunk.code
+        constants: List[object] = chunk.constants
+        stack: List[Any] = []
+        push = stack.append
+        pop = stack.pop
+        numbers: frozenset = NUMBER_TYPES
+        ip: int = 0
+
+        while True:
+            op: int = code[ip]
+            ip += 1
+            # Most frequent instructions first
+            if op == 0:  # CONSTANT
+                push(constants[code[ip]])
+                ip += 1
+            elif op <= 3:  # NIL, TRUE, FALSE
+                push(None if op == 1 else op == 2)
+            elif op == 16:  # RETURN
+                return pop()
+            elif op == 4:  # NEGATE
+                right = stack[-1]
+                if type(right) not in numbers:
+                    self.error(chunk, ip - 1, "Operand must be a number.")
+                stack[-1] = -right
+            elif op == 5:  # NOT
+                stack[-1] = not isTruthy(stack[-1])
+            else:
+                right = pop()
+                left = stack[-1]
+                if op >= 14:  # EQUAL, NOT_EQUAL
+                    stack[-1] = isEqual(left, right) == (op == 14)
+                    continue
+                if type(left) not in numbers or type(right) not in numbers:
+                    if op == 6 and type(left) is str and type(right) is str:
+                        stack[-1] = left + right
+                        continue
+                    if op == 6:
+                        message = "Operands must be two numbers or two strings."
+                    else:
+                        message = "Operands must be numbers."
+                    self.error(chunk, ip - 1, message)
+                if op == 6:
+                    stack[-1] = left + right
+                elif op == 7:
+                    stack[-1] = left - right
+                elif op == 8:
+                    stack[-1] = left * right
+                elif op == 9:
+                    stack[-1] = divide(left, right)
+                elif op == 10:
+                    stack[-1] = left > right
+                elif op == 11:
+                    stack[-1] = left >= right
+                elif op == 12:
+                    stack[-1] = left < right
+                else:
+                    stack[-1] = left <= right
+
+    def error(self, chunk: Chunk, offset: int, message: str) -> None:
+        raise LoxRuntimeError(chunk.operators[offset], message)
+
+
+if __name__ == "__main__":
+
+    # Test of the Compiler and VM: (1 + 2) * (4 - 3)
+    expression: Expr = Binary(
+        Grouping(
+            Binary(Literal(1), Token(TokenType.PLUS, "+", None, 1), Literal(2))
+        ),
+        Token(TokenType.STAR, "*", None, 1),
+        Grouping(
+            Binary(Literal(4), Token(TokenType.MINUS, "-", None, 1), Literal(3))
+        ),
+    )
+
+    chunk: Chunk = Compiler().compile(expression)
+    print(chunk.disassemble())
+    print(stringify(VM().run(chunk)))